@@ -0,0 +1,73 @@
+"""Benchmark IntakeCatalog._query on a synthetic catalog.
+
+Compares the current implementation, which normalises the time columns and indexes
+the rows by ds_id once in `load()`, against the original one, which normalised the
+whole catalog on every query and built the records with `iterrows`.
+
+Usage: python benchmarks/bench_catalog_query.py [n_datasets] [files_per_dataset]
+"""
+
+import sys
+import timeit
+
+import pandas as pd
+
+from daops.catalog.intake import CatalogIndex, IntakeCatalog
+from daops.catalog.util import MAX_DATETIME, MIN_DATETIME, parse_time
+
+
+def make_catalog(n_datasets, files_per_dataset):
+    rows = []
+    for i in range(n_datasets):
+        ds_id = f"c3s-cmip6.CMIP.INST.MODEL.historical.r1i1p1f1.day.var{i}.gn.v20190101"
+        for j in range(files_per_dataset):
+            year = 1850 + j
+            if i % 50 == 0:
+                start = end = None if j % 2 else "undefined"
+            else:
+                start, end = f"{year}-01-01T12:00:00", f"{year}-12-31T12:00:00"
+            rows.append([ds_id, f"{ds_id}/{j}.nc", start, end])
+
+    return pd.DataFrame(rows, columns=["ds_id", "path", "start_time", "end_time"])
+
+
+def legacy_query(df, collection, time=None, time_components=None):
+    start, end = parse_time(time, time_components)
+
+    df = df.fillna({"start_time": MIN_DATETIME, "end_time": MAX_DATETIME})
+    df = df.replace({"start_time": {"undefined": MIN_DATETIME}})
+    df = df.replace({"end_time": {"undefined": MAX_DATETIME}})
+
+    result = df.loc[
+        (df.ds_id.isin(collection)) & (df.end_time >= start) & (df.start_time <= end)
+    ]
+    records = {}
+    for _, row in result.iterrows():
+        if row.ds_id not in records:
+            records[row.ds_id] = []
+        records[row.ds_id].append(row.path)
+    return records
+
+
+def main(n_datasets=20000, files_per_dataset=20, number=5):
+    df = make_catalog(n_datasets, files_per_dataset)
+    collection = sorted(set(df.ds_id))[:: max(1, n_datasets // 20)]
+    time = "1860-01-01/1865-12-31"
+
+    cat = IntakeCatalog(project="c3s-cmip6", url="unused.yaml")
+    index = CatalogIndex(IntakeCatalog._prepare(df))
+    cat._load_index = lambda: index
+
+    assert cat._query(collection, time) == legacy_query(df, collection, time)
+
+    legacy = timeit.timeit(lambda: legacy_query(df, collection, time), number=number)
+    current = timeit.timeit(lambda: cat._query(collection, time), number=number)
+
+    print(f"catalog rows: {len(df)}, datasets queried: {len(collection)}")
+    print(f"legacy:  {legacy / number * 1000:.1f} ms per query")
+    print(f"current: {current / number * 1000:.1f} ms per query")
+    print(f"speedup: {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,73 @@
+"""Benchmark get_lead_times on daily decadal hindcast time axes.
+
+Compares the current implementation, which takes the difference of the day numbers
+of the times and the start date as numpy arrays, against the original one, which
+subtracted the start date from each time in a Python loop and built a list of days.
+
+Usage: python benchmarks/bench_lead_times.py [n_times]
+"""
+
+import sys
+import timeit
+from datetime import datetime
+
+import cftime
+import xarray as xr
+
+from daops.fix_utils.decadal_utils import get_lead_times, get_start_date
+
+DS_ID = "c3s-cmip6-decadal.DCPP.MOHC.HadGEM3-GC31-MM.dcppA-hindcast.s1960-r1i1p1f2.day.tas.gn.v20200417"
+CALENDARS = ["standard", "proleptic_gregorian", "noleap", "all_leap", "360_day"]
+
+
+def make_dataset(n_times, calendar):
+    times = xr.date_range(
+        "1960-11-01T12:00:00",
+        periods=n_times,
+        freq="D",
+        calendar=calendar,
+        use_cftime=True,
+    )
+    return xr.Dataset(coords={"time": times})
+
+
+def legacy_get_lead_times(ds_id, ds):
+    start_date = datetime.fromisoformat(get_start_date(ds_id, ds))
+    cal = ds.time.values[0].calendar
+    reftime = cftime.datetime(
+        start_date.year,
+        start_date.month,
+        start_date.day,
+        start_date.hour,
+        start_date.minute,
+        start_date.second,
+        calendar=cal,
+    )
+
+    lead_times = []
+    for time in ds.time.values:
+        td = time - reftime
+        lead_times.append(td.days)
+
+    return lead_times
+
+
+def main(n_times=3650, number=10):
+    print(f"time steps: {n_times}")
+
+    for calendar in CALENDARS:
+        ds = make_dataset(n_times, calendar)
+        assert get_lead_times(DS_ID, ds).tolist() == legacy_get_lead_times(DS_ID, ds)
+
+        legacy = timeit.timeit(lambda: legacy_get_lead_times(DS_ID, ds), number=number)
+        current = timeit.timeit(lambda: get_lead_times(DS_ID, ds), number=number)
+
+        print(
+            f"{calendar:>20}: legacy {legacy / number * 1000:.1f} ms, "
+            f"current {current / number * 1000:.1f} ms, "
+            f"speedup {legacy / current:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,124 @@
+"""Benchmark apply_post_processors on a decadal-style fix chain.
+
+Compares applying the post-processing fixes in one batch against applying them one
+at a time with ``func(ds_id, ds, **operands)``, which creates a new Dataset for
+every coordinate or data variable added.
+
+Usage: python benchmarks/bench_post_process.py [n_coords] [n_vars]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import xarray as xr
+
+from daops.data_utils.attr_utils import edit_global_attrs, edit_var_attrs
+from daops.data_utils.coord_utils import add_coord, add_scalar_coord
+from daops.data_utils.var_utils import add_data_var
+from daops.utils.post_processor import apply_post_processors
+
+DS_ID = "c3s-cmip6-decadal.DCPP.MOHC.HadGEM3-GC31-MM.dcppA-hindcast.s1960-r1i1p1f2.Amon.tas.gn.v20200417"
+
+
+def make_dataset(n_vars, n_times=120):
+    times = xr.date_range(
+        "1960-11-16", periods=n_times, freq="MS", calendar="360_day", use_cftime=True
+    )
+    data_vars = {
+        "tas": (("time", "lat", "lon"), np.zeros((n_times, 18, 36), dtype="f4"))
+    }
+    for i in range(n_vars):
+        data_vars[f"aux{i}"] = (("time",), np.zeros(n_times))
+
+    return xr.Dataset(
+        data_vars,
+        coords={"time": times, "lat": np.arange(18.0), "lon": np.arange(36.0)},
+    )
+
+
+def make_fixes(n_coords):
+    fixes = [
+        (
+            edit_global_attrs,
+            {
+                "attrs": {
+                    "startdate": "derive: daops.fix_utils.decadal_utils.get_sub_experiment_id",
+                    "forcing_description": "derive: daops.fix_utils.decadal_utils.get_decadal_model_attr_from_dict: forcing_description",
+                }
+            },
+        ),
+        (
+            add_scalar_coord,
+            {
+                "var_id": "reftime",
+                "value": "derive: daops.fix_utils.decadal_utils.get_reftime",
+                "dtype": "datetime64[ns]",
+                "attrs": {"standard_name": "forecast_reference_time"},
+                "encoding": {"dtype": "int32", "units": "days since 1850-01-01"},
+            },
+        ),
+        (
+            add_coord,
+            {
+                "var_id": "leadtime",
+                "dim": ["time"],
+                "value": "derive: daops.fix_utils.decadal_utils.get_lead_times",
+                "dtype": "float64",
+                "attrs": {"units": "days"},
+                "encoding": {"dtype": "double"},
+            },
+        ),
+    ]
+
+    for i in range(n_coords):
+        fixes.append(
+            (
+                add_scalar_coord,
+                {
+                    "var_id": f"coord{i}",
+                    "value": str(i),
+                    "dtype": "int32",
+                    "attrs": {"long_name": f"coord {i}"},
+                    "encoding": {"dtype": "int32"},
+                },
+            )
+        )
+        fixes.append((edit_var_attrs, {"var_id": f"coord{i}", "attrs": {"units": "1"}}))
+
+    fixes.append(
+        (add_data_var, {"var_id": "crs", "value": 1, "dtype": "int32", "attrs": {}})
+    )
+    return fixes
+
+
+def apply_in_turn(ds_id, ds, post_processors):
+    for func, operands in post_processors:
+        ds = func(ds_id, ds, **operands)
+    return ds
+
+
+def main(n_coords=20, n_vars=50, number=20):
+    fixes = make_fixes(n_coords)
+    ds = make_dataset(n_vars)
+
+    xr.testing.assert_identical(
+        apply_post_processors(DS_ID, ds.copy(), fixes),
+        apply_in_turn(DS_ID, ds.copy(), fixes),
+    )
+
+    in_turn = timeit.timeit(
+        lambda: apply_in_turn(DS_ID, ds.copy(), fixes), number=number
+    )
+    batched = timeit.timeit(
+        lambda: apply_post_processors(DS_ID, ds.copy(), fixes), number=number
+    )
+
+    print(f"fixes: {len(fixes)}, variables: {len(ds.variables)}")
+    print(f"in turn: {in_turn / number * 1000:.1f} ms per dataset")
+    print(f"batched: {batched / number * 1000:.1f} ms per dataset")
+    print(f"speedup: {in_turn / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -1,11 +1,142 @@
 """Utilities for working with Intake catalogs."""
 
+import hashlib
+import json
+import os
+import threading
+import time
+
+import fsspec
 import intake
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+try:
+    import pyarrow  # needed for the local Parquet copies of catalogs
+except ImportError:
+    pyarrow = None
 
 from daops import config_
 
 from .base import Catalog
-from .util import MAX_DATETIME, MIN_DATETIME, parse_time
+from .util import (
+    MAX_DATETIME,
+    MIN_DATETIME,
+    parse_time,
+    parse_time_components,
+    span_matches_components,
+    to_time_key,
+)
+
+
+class CatalogIndex:
+    """Index of a loaded catalog table by dataset id.
+
+    The rows are sorted by ds_id and start time, so the files of each dataset are a
+    contiguous range of rows, and the time filtering within a range is a binary search.
+    """
+
+    def __init__(self, df):  # noqa: D107
+        self.df = df.sort_values(["ds_id", "_start_time"], kind="stable").reset_index(
+            drop=True
+        )
+        self.paths = self.df.path.to_numpy()
+        self.starts = self.df._start_time.to_numpy()
+        self.ends = self.df._end_time.to_numpy()
+
+        # ds_id -> (first row, last row + 1, whether the end times are sorted too)
+        self.ranges = {}
+        ds_ids = self.df.ds_id.to_numpy()
+        bounds = np.flatnonzero(ds_ids[1:] != ds_ids[:-1]) + 1
+        for first, stop in zip(
+            np.r_[0, bounds], np.r_[bounds, len(ds_ids)], strict=True
+        ):
+            if stop > first:
+                ends = self.ends[first:stop]
+                self.ranges[ds_ids[first]] = (
+                    first,
+                    stop,
+                    bool(np.all(ends[1:] >= ends[:-1])),
+                )
+
+    def search(self, ds_id, start, end, time_components=None):
+        """Return the paths of the files of `ds_id` that overlap the `start` and `end` time keys.
+
+        If `time_components` are given (see `parse_time_components`), files whose
+        time spans cannot hold any of them are dropped too.
+        """
+        if ds_id not in self.ranges:
+            return []
+
+        first, stop, ends_sorted = self.ranges[ds_id]
+        hi = first + np.searchsorted(self.starts[first:stop], end, side="right")
+
+        if ends_sorted:
+            lo = first + np.searchsorted(self.ends[first:hi], start, side="left")
+            rows = np.arange(lo, hi)
+        else:
+            rows = first + np.flatnonzero(self.ends[first:hi] >= start)
+
+        if time_components:
+            rows = [
+                row
+                for row in rows
+                if span_matches_components(
+                    self.starts[row], self.ends[row], time_components
+                )
+            ]
+
+        return self.paths[rows].tolist()
+
+
+# Catalogs and their indexes are shared by all IntakeCatalog instances in the process
+# {url: (intake catalog, time checked)}
+_catalogs = {}
+# {(url, project): (CatalogIndex, validator, time checked)}
+_indexes = {}
+_cache_lock = threading.RLock()
+
+
+def _catalog_config():
+    return config_().get("catalog", {})
+
+
+def _revalidate_interval():
+    return _catalog_config().get("revalidate_interval", 600)
+
+
+def get_validator(urlpath):
+    """Return a value that changes whenever the file at `urlpath` changes.
+
+    Uses the ETag (or Last-Modified) of a remote file and the modification time of a
+    local file, together with its size. Returns None if the file cannot be checked.
+    """
+    if isinstance(urlpath, (list, tuple)):
+        validators = [get_validator(path) for path in urlpath]
+        return None if None in validators else validators
+
+    if not urlpath:
+        return None
+
+    try:
+        fs, path = fsspec.core.url_to_fs(urlpath)
+        info = fs.info(path)
+    except Exception as err:
+        logger.warning(f"Could not check catalog file {urlpath} for changes: {err}")
+        return None
+
+    stamp = info.get("ETag") or info.get("Last-Modified") or info.get("mtime")
+    if stamp is None:
+        return None
+    return [str(stamp), info.get("size")]
+
+
+def clear_cache():
+    """Clear the catalogs and indexes held in memory."""
+    with _cache_lock:
+        _catalogs.clear()
+        _indexes.clear()
 
 
 class IntakeCatalog(Catalog):
@@ -14,27 +145,24 @@ class IntakeCatalog(Catalog):
     def __init__(self, project, url=None):
         super().__init__(project)
         self.url = url or config_().get("catalog", None).get("intake_catalog_url", None)
-        self._cat = None
-        self._store = {}
-        # intake_config["cache_dir"] = "/tmp/inventory_cache"
 
     @property
     def catalog(self):
         """Return the intake catalog."""
-        if not self._cat:
-            self._cat = intake.open_catalog(self.url)
-        return self._cat
+        with _cache_lock:
+            cat, checked = _catalogs.get(self.url, (None, None))
+            if not cat or time.monotonic() - checked > _revalidate_interval():
+                cat = intake.open_catalog(self.url)
+                _catalogs[self.url] = cat, time.monotonic()
+            return cat
 
-    def load(self):
-        """Load the catalog."""
-        if self.project not in self._store:
-            self._store[self.project] = self.catalog[self.project].read()
-        return self._store[self.project]
-
-    def _query(self, collection, time=None, time_components=None):
-        df = self.load()
-        start, end = parse_time(time, time_components)
+    @staticmethod
+    def _prepare(df):
+        """Normalise the time columns of the catalog once, when it is loaded.
 
+        Missing or undefined times (fx datasets) are set to the widest possible range,
+        and the `_start_time`/`_end_time` columns hold the times as comparable `int64` keys.
+        """
         # workaround for NaN values when no time axis (fx datasets)
         df = df.fillna({"start_time": MIN_DATETIME, "end_time": MAX_DATETIME})
 
@@ -42,15 +170,79 @@ class IntakeCatalog(Catalog):
         df = df.replace({"start_time": {"undefined": MIN_DATETIME}})
         df = df.replace({"end_time": {"undefined": MAX_DATETIME}})
 
+        df["_start_time"] = to_time_key(df.start_time)
+        df["_end_time"] = to_time_key(df.end_time)
+        return df
+
+    def _parquet_path(self):
+        cache_dir = _catalog_config().get("cache_dir")
+        if not cache_dir:
+            return None
+
+        if pyarrow is None:
+            logger.warning(
+                "pyarrow is not installed, so the catalog is read from its CSV file "
+                f"instead of a local Parquet copy in {cache_dir}"
+            )
+            return None
+
+        key = hashlib.sha256(f"{self.url}|{self.project}".encode()).hexdigest()[:16]
+        return os.path.join(cache_dir, f"{self.project}-{key}.parquet")
+
+    def _read(self, validator):
+        """Read the prepared project table, from the local Parquet copy if it is up to date."""
+        parquet_path = self._parquet_path()
+        meta_path = f"{parquet_path}.json"
+
+        if parquet_path and validator and os.path.isfile(meta_path):
+            with open(meta_path) as fin:
+                if json.load(fin) == validator:
+                    logger.info(f"Reading catalog from local copy: {parquet_path}")
+                    return pd.read_parquet(parquet_path, memory_map=True)
+
+        df = self._prepare(self.catalog[self.project].read())
+
+        if parquet_path and validator:
+            os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+            df.to_parquet(f"{parquet_path}.tmp", index=False)
+            os.replace(f"{parquet_path}.tmp", parquet_path)
+            with open(meta_path, "w") as fout:
+                json.dump(validator, fout)
+
+        return df
+
+    def _load_index(self):
+        key = (self.url, self.project)
+
+        with _cache_lock:
+            index, validator, checked = _indexes.get(key, (None, None, None))
+            if (
+                index is not None
+                and time.monotonic() - checked <= _revalidate_interval()
+            ):
+                return index
+
+            latest = get_validator(getattr(self.catalog[self.project], "urlpath", None))
+            if index is None or latest is None or latest != validator:
+                index = CatalogIndex(self._read(latest))
+
+            _indexes[key] = index, latest, time.monotonic()
+            return index
+
+    def load(self):
+        """Load the catalog."""
+        return self._load_index().df
+
+    def _query(self, collection, time=None, time_components=None):
+        index = self._load_index()
+        start, end = parse_time(time, time_components)
+        start, end = to_time_key(start), to_time_key(end)
+        components = parse_time_components(time_components)
+
         # search
-        result = df.loc[
-            (df.ds_id.isin(collection))
-            & (df.end_time >= start)
-            & (df.start_time <= end)
-        ]
         records = {}
-        for _, row in result.iterrows():
-            if row.ds_id not in records:
-                records[row.ds_id] = []
-            records[row.ds_id].append(row.path)
+        for ds_id in collection:
+            paths = index.search(ds_id, start, end, components)
+            if paths:
+                records[ds_id] = paths
         return records
@@ -2,6 +2,8 @@
 
 import datetime
 
+import numpy as np
+import pandas as pd
 from clisops.parameter.time_components_parameter import TimeComponentsParameter
 from clisops.parameter.time_parameter import TimeParameter
 
@@ -31,3 +33,69 @@ def parse_time(time=None, time_components=None):
         end = MAX_DATETIME
 
     return start, end
+
+
+def to_time_key(value):
+    """Convert ISO 8601 datetime strings to comparable `int64` keys of the form YYYYMMDDhhmmss.
+
+    Works on a single string or a `pandas.Series` of strings. The keys are
+    ordered as the datetimes are, without needing a calendar, so dates such as
+    30 February in a 360-day calendar are handled.
+    """
+    if isinstance(value, pd.Series):
+        digits = value.astype(str).str.replace(r"\D", "", regex=True)
+        return digits.str.ljust(14, "0").str[:14].astype(np.int64)
+
+    digits = "".join(c for c in str(value) if c.isdigit())
+    return np.int64(digits.ljust(14, "0")[:14])
+
+
+def parse_time_components(time_components=None):
+    """Parse the time components into a dictionary of component names and their values.
+
+    Returns None if no time components are given.
+    """
+    if not time_components:
+        return None
+
+    if not isinstance(time_components, TimeComponentsParameter):
+        time_components = TimeComponentsParameter(time_components)
+
+    return time_components.value or None
+
+
+def span_matches_components(start, end, time_components):
+    """Return whether the time span from `start` to `end` may hold any of the time components.
+
+    The span is given as time keys (see `to_time_key`) and `time_components` as
+    returned by `parse_time_components`. Only the years and months are compared,
+    so a span is kept if it holds a requested month of a requested year, whatever
+    the other components are.
+    """
+    if not time_components:
+        return True
+
+    years = time_components.get("year")
+    months = time_components.get("month")
+
+    start_year, start_month = divmod(int(start) // 10**8, 100)
+    end_year, end_month = divmod(int(end) // 10**8, 100)
+
+    if years is None:
+        # any month is held by a span that covers a whole year
+        if months is None or end_year - start_year >= 2:
+            return True
+        years = range(start_year, end_year + 1)
+
+    for year in years:
+        if not start_year <= year <= end_year:
+            continue
+        if months is None:
+            return True
+
+        first = start_month if year == start_year else 1
+        last = end_month if year == end_year else 12
+        if any(first <= month <= last for month in months):
+            return True
+
+    return False
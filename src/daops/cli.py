@@ -13,12 +13,14 @@ import sys
 from clisops.utils.file_utils import FileMapper
 
 from daops.ops.subset import subset
+from daops.utils.consolidate import build_file_index
+from daops.utils.fix_store import build_snapshot
 
 
 def parse_args():
     """Parse the command line arguments."""
     parser = argparse.ArgumentParser()
-    sub_parsers = parser.add_subparsers()
+    sub_parsers = parser.add_subparsers(dest="command")
     sub_parsers.required = True
 
     parser_subset = sub_parsers.add_parser("subset", help="subset data")
@@ -73,6 +75,33 @@ def parse_args():
     )
     parser_subset.add_argument("collection", type=str, nargs="+", default=list)
 
+    parser_index = sub_parsers.add_parser(
+        "index-years", help="record the time spans held in data files in the file index"
+    )
+    parser_index.add_argument(
+        "--index-path",
+        "-i",
+        type=str,
+        help="path of the file index (defaults to file_index_path in the config)",
+    )
+    parser_index.add_argument(
+        "paths", type=str, nargs="+", help="data files or directories to scan"
+    )
+
+    parser_snapshot = sub_parsers.add_parser(
+        "build-fix-snapshot",
+        help="build the snapshot used by the local fix store from exports of the fix index",
+    )
+    parser_snapshot.add_argument(
+        "--snapshot-path",
+        "-s",
+        type=str,
+        help="path of the snapshot (defaults to snapshot_path in the config)",
+    )
+    parser_snapshot.add_argument(
+        "dump_paths", type=str, nargs="+", help="exported documents of the fix index"
+    )
+
     return parser.parse_args()
 
 
@@ -117,6 +146,17 @@ def check_env():
 def main():
     """Console script for daops."""
     args = parse_args()
+
+    if args.command == "index-years":
+        count = build_file_index(args.paths, index_path=args.index_path)
+        print(f"Indexed {count} files")
+        return
+
+    if args.command == "build-fix-snapshot":
+        count = build_snapshot(args.dump_paths, snapshot_path=args.snapshot_path)
+        print(f"Built fix store snapshot of {count} datasets")
+        return
+
     params = get_params(args)
     check_env()
     ret = subset(**params)
@@ -1,13 +1,37 @@
 """Common utility functions for data operations."""
 
+import threading
 from pydoc import locate
 
+_resolved = {}
+_resolved_lock = threading.Lock()
+
+
+def resolve(path):
+    """Return the object at the dotted `path`, e.g. "daops.data_utils.attr_utils.fix_attr".
+
+    The result of `pydoc.locate` is cached so that the import machinery is only
+    used the first time a path is resolved. Paths that cannot be found are not
+    cached and return None.
+    """
+    try:
+        return _resolved[path]
+    except KeyError:
+        pass
+
+    obj = locate(path)
+    if obj is not None:
+        with _resolved_lock:
+            _resolved[path] = obj
+
+    return obj
+
 
 def handle_derive_str(value, ds_id, ds):
     """Handle the derive string."""
     if isinstance(value, str) and "derive" in value:
         components = value.split(":")
-        func = locate(components[1].strip())
+        func = resolve(components[1].strip())
         if len(components) > 2:
             arg = value.split(":")[-1].strip()
             return func(ds_id, ds, arg)
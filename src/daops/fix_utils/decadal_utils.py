@@ -4,6 +4,7 @@ import re
 from datetime import datetime
 
 import cftime
+import numpy as np
 
 model_specific_global_attrs = {
     "CMCC-CM2-SR5": {
@@ -38,28 +39,20 @@ def get_time_calendar(ds_id, ds):
 
 
 def get_lead_times(ds_id, ds):
-    """Get the lead times."""
-    start_date = datetime.fromisoformat(get_start_date(ds_id, ds))
+    """Get the lead times.
 
+    The lead times are the number of whole days from the start date of the
+    forecast to each time, in the calendar of the time axis.
+    """
+    start_date = datetime.fromisoformat(get_start_date(ds_id, ds))
     cal = get_time_calendar(ds_id, ds)
-    reftime = cftime.datetime(
-        start_date.year,
-        start_date.month,
-        start_date.day,
-        start_date.hour,
-        start_date.minute,
-        start_date.second,
-        calendar=cal,
-    )
 
-    lead_times = []
-    # calculate leadtime from reftime and valid times
-    for time in ds.time.values:
-        td = time - reftime
-        days = td.days
-        lead_times.append(days)
-
-    return lead_times
+    # calculate leadtime from the start date and valid times in one call, then round
+    # down to the whole days between them, as timedelta.days does
+    days = cftime.date2num(
+        ds.time.values, f"days since {start_date.isoformat(sep=' ')}", calendar=cal
+    )
+    return np.floor(days).astype(np.int64)
 
 
 def get_start_date(ds_id, ds):
@@ -0,0 +1,141 @@
+"""Asynchronous versions of the operations, for use from an asyncio event loop.
+
+The lookups of each request (consolidating the collection against the catalog or
+file system, and looking up fixes) run on the shared "async" thread pool, and the
+opening and processing of each dataset on the shared "compute" thread pool, so
+the event loop is never blocked.
+
+If the coroutine is cancelled, datasets that have not started are cancelled and
+the outputs of any that are being processed are discarded once they finish.
+"""
+
+import asyncio
+import collections
+import functools
+import inspect
+
+from daops.ops.average import (
+    Average,
+    AverageShape,
+    AverageTime,
+    average_over_dims,
+    average_shape,
+    average_time,
+)
+from daops.ops.regrid import Regrid, regrid
+from daops.ops.subset import Subset, subset
+from daops.processor import get_executor, get_max_workers, run
+from daops.utils import normalise
+from daops.utils.metrics import timer
+from daops.utils.outputs import TaggedOperation
+
+__all__ = [
+    "async_average_over_dims",
+    "async_average_shape",
+    "async_average_time",
+    "async_calculate",
+    "async_regrid",
+    "async_subset",
+]
+
+
+async def _run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    executor = get_executor("threads", name="async")
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+async def async_calculate(op, max_workers=None, raise_errors=True):
+    """Process the input of an Operation and calculate the result without blocking the event loop.
+
+    :param op: A `daops.ops.base.Operation`.
+    :param max_workers: Maximum number of datasets processed at once.
+                        Defaults to `max_workers` in the `[processor]` section of the config.
+    :param raise_errors: If False the exceptions of the datasets that failed are left in
+                         the `errors` of the ResultSet rather than the first one raised.
+    :return: A `daops.utils.normalise.ResultSet`.
+    """
+    loop = asyncio.get_running_loop()
+    op._update_params()
+    operation = TaggedOperation(op.get_operation_callable())
+
+    with timer(op.metrics, "fix_lookup"):
+        fixes = await _run_blocking(
+            normalise.lookup_fixes, op.collection, op._apply_fixes
+        )
+
+    executor = get_executor("threads", name="compute")
+    limit = asyncio.Semaphore(get_max_workers(max_workers))
+
+    async def _process(dset, file_paths):
+        async with limit:
+            return await loop.run_in_executor(
+                executor,
+                functools.partial(
+                    run,
+                    operation,
+                    dset,
+                    file_paths,
+                    op._apply_fixes,
+                    fixes.get(dset),
+                    **op.params,
+                ),
+            )
+
+    tasks = collections.OrderedDict(
+        (dset, asyncio.ensure_future(_process(dset, file_paths)))
+        for dset, file_paths in op.collection.items()
+    )
+
+    try:
+        await asyncio.wait(tasks.values())
+    finally:
+        # stop datasets that are still waiting if the request has been cancelled
+        for task in tasks.values():
+            task.cancel()
+
+    outputs = (
+        (
+            (dset, None, task.exception())
+            if task.exception()
+            else (dset, task.result(), None)
+        )
+        for dset, task in tasks.items()
+    )
+    return op._collect_results(outputs, raise_errors)
+
+
+async def _calculate(op_class, func, args, kwargs):
+    # bind to the signature of the synchronous function so the defaults are the same
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+
+    op = await _run_blocking(op_class, **bound.arguments)
+    return await async_calculate(op)
+
+
+async def async_subset(*args, **kwargs):
+    """Asynchronous version of `daops.ops.subset.subset`, taking the same arguments."""
+    return await _calculate(Subset, subset, args, kwargs)
+
+
+async def async_average_over_dims(*args, **kwargs):
+    """Asynchronous version of `daops.ops.average.average_over_dims`, taking the same arguments."""
+    return await _calculate(Average, average_over_dims, args, kwargs)
+
+
+async def async_average_shape(*args, **kwargs):
+    """Asynchronous version of `daops.ops.average.average_shape`, taking the same arguments."""
+    return await _calculate(AverageShape, average_shape, args, kwargs)
+
+
+async def async_average_time(*args, **kwargs):
+    """Asynchronous version of `daops.ops.average.average_time`, taking the same arguments."""
+    return await _calculate(AverageTime, average_time, args, kwargs)
+
+
+async def async_regrid(*args, **kwargs):
+    """Asynchronous version of `daops.ops.regrid.regrid`, taking the same arguments."""
+    return await _calculate(Regrid, regrid, args, kwargs)
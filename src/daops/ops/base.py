@@ -2,8 +2,10 @@
 
 from clisops.parameter import collection_parameter
 
-from daops.processor import process
+from daops.processor import get_mode, imap, imap_cluster
 from daops.utils import consolidate, normalise
+from daops.utils.metrics import new_metrics, peak_rss, timer
+from daops.utils.outputs import TaggedOperation
 
 
 class Operation:
@@ -17,11 +19,13 @@ class Operation:
         output_dir=None,
         output_type="netcdf",
         apply_fixes=True,
+        mode=None,
         **params,
     ):
         """Construct operation.
 
-        Sets common input parameters as attributes.
+        Sets common input parameters as attributes, and `self.metrics` in which the
+        time taken by each stage of the operation is recorded (see `daops.utils.metrics`).
         Parameters that are specific to each operation are handled in: self._resolve_params().
         """
         self._file_namer = file_namer
@@ -29,8 +33,12 @@ class Operation:
         self._output_dir = output_dir
         self._output_type = output_type
         self._apply_fixes = apply_fixes
+        self._mode = mode
+        self.metrics = new_metrics()
         self._resolve_params(collection, **params)
-        self._consolidate_collection()
+
+        with timer(self.metrics, "consolidate"):
+            self._consolidate_collection()
 
     def _resolve_params(self, collection, **params):
         """Resolve the operation-specific input parameters to `self.params` and parameterise collection parameter and set to `self.collection`."""
@@ -40,26 +48,23 @@ class Operation:
     def _consolidate_collection(self):
         """Take in the collection object and finds the file paths relating to each input dataset.
 
-        If a time range has been supplied then only the files relating to this time range are recorded.
+        If a time range or time components have been supplied then only the files relating to
+        them are recorded.
         Set the result to `self.collection`.
         """
-        if "time" in self.params:
-            self.collection = consolidate.consolidate(
-                self.collection, time=self.params.get("time")
-            )
-
-        else:
-            self.collection = consolidate.consolidate(self.collection)
+        time_params = {
+            key: self.params[key]
+            for key in ("time", "time_components")
+            if key in self.params
+        }
+        self.collection = consolidate.consolidate(self.collection, **time_params)
 
     def get_operation_callable(self):
         """Return the operation callable from clisops."""
         raise NotImplementedError
 
-    def calculate(self):
-        """Process the input and calculate the result using clisops.
-
-        It then returns the result as a daops.normalise.ResultSet object.
-        """
+    def _update_params(self):
+        """Add the output settings to `self.params`, which are passed to the operation callable."""
         config = {
             "output_type": self._output_type,
             "output_dir": self._output_dir,
@@ -69,18 +74,97 @@ class Operation:
 
         self.params.update(config)
 
-        # Normalise (i.e. "fix") data inputs based on "character"
-        norm_collection = normalise.normalise(self.collection, self._apply_fixes)
+    def _collect_results(self, outputs, raise_errors=True):
+        """Add (ds id, result, exception) tuples to a ResultSet.
 
-        rs = normalise.ResultSet(vars())
+        The collection and parameters of the operation are recorded as the inputs
+        in the metadata of the ResultSet, along with its metrics. If `raise_errors`
+        is True the first exception is raised, otherwise the exceptions are left in
+        the `errors` of the ResultSet.
+        """
+        inputs = {"collection": self.collection, "params": self.params}
+        rs = normalise.ResultSet(inputs, self.metrics)
 
-        # change name of data ref here
-        for dset, collection in norm_collection.items():
-            # Process each input dataset (either in series or
-            # parallel)
-            rs.add(
-                dset,
-                process(self.get_operation_callable(), collection, **self.params),
-            )
+        for dset, result, err in outputs:
+            if err is None:
+                rs.add(dset, result)
+            else:
+                rs.add_error(dset, err)
+
+        self.metrics["process_peak_rss"] = peak_rss()
+
+        if rs.errors and raise_errors:
+            raise next(iter(rs.errors.values()))
 
         return rs
+
+    def _iter_outputs(self, mode):
+        """Lazily process the input, yielding a (ds id, result, exception) tuple per dataset in collection order."""
+        # outputs are tagged with their type by the worker that wrote them
+        operation = TaggedOperation(self.get_operation_callable())
+
+        if mode == "dask":
+            # Open, fix and process each input dataset on the cluster workers
+            return imap_cluster(
+                operation,
+                self.collection,
+                self._apply_fixes,
+                **self.params,
+            )
+
+        # Normalise (i.e. "fix") data inputs based on "character", one dataset at a time
+        # A dataset that fails to open or fix is recorded as the error of that dataset
+        norm_collection = normalise.iter_normalise(
+            self.collection,
+            self._apply_fixes,
+            metrics=self.metrics,
+            capture_errors=True,
+        )
+
+        # Process each input dataset (either in series or parallel)
+        return imap(operation, norm_collection, mode=mode, **self.params)
+
+    def iter_results(self):
+        """Process the input and yield the outputs of each dataset as soon as they are ready.
+
+        Datasets are yielded in collection order, so that the outputs of the first
+        datasets can be used while the rest are still being processed.
+
+        :return: Generator of (ds id, outputs) tuples.
+                 The exception of the first dataset that fails is raised when it is reached.
+        """
+        self._update_params()
+
+        for dset, result, err in self._iter_outputs(get_mode(self._mode)):
+            if err is not None:
+                raise err
+            yield dset, result
+
+    def calculate(self, on_result=None, raise_errors=True):
+        """Process the input and calculate the result using clisops.
+
+        It then returns the result as a daops.normalise.ResultSet object.
+
+        :param on_result: Optional callable, called with the ds id and outputs of each
+                          dataset as soon as they are ready, in collection order.
+        :param raise_errors: If True (the default) the exception of the first dataset
+                             that failed is raised once all datasets are processed.
+                             If False the ResultSet is returned, with the exception
+                             of each dataset that failed in its `errors`.
+        """
+        self._update_params()
+
+        mode = get_mode(self._mode)
+        outputs = self._iter_outputs(mode)
+
+        if on_result is not None:
+            outputs = _notify(outputs, on_result)
+
+        return self._collect_results(outputs, raise_errors)
+
+
+def _notify(outputs, on_result):
+    for dset, result, err in outputs:
+        if err is None:
+            on_result(dset, result)
+        yield dset, result, err
@@ -1,16 +1,326 @@
 """Module to dispatch the processing operation to the correct mode (serial or parallel)."""
 
+import collections
+import collections.abc
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
 from loguru import logger
 
+from daops import config_
+from daops.utils.core import open_dataset
+from daops.utils.metrics import input_metrics, timer
+from daops.utils.shared import SharedObjects
+
+MODES = ("serial", "threads", "processes", "dask")
+
+_executors = SharedObjects()
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_mode(mode=None):
+    """Return the processing mode, falling back to the `[processor]` section of the config."""
+    mode = mode or config_().get("processor", {}).get("mode", "serial")
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown processing mode: {mode}. Must be one of: {MODES}")
+
+    return mode
+
+
+def get_max_workers(max_workers=None):
+    """Return the number of workers, falling back to the `[processor]` section of the config."""
+    max_workers = max_workers or config_().get("processor", {}).get("max_workers")
+    return max_workers or os.cpu_count() or 1
+
+
+def get_executor(mode="threads", max_workers=None, name="compute"):
+    """Return the shared executor for `mode`, creating it on first use.
+
+    Executors are kept for the lifetime of the process so that the cost of
+    starting workers is only paid once. Work that waits on other work must use an
+    executor with a different `name` (e.g. "io" for file system access) so that it
+    cannot be starved by the tasks it is waiting on.
+    """
+    max_workers = get_max_workers(max_workers)
+
+    def _start():
+        if mode == "threads":
+            executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"daops-{name}"
+            )
+        elif mode == "processes":
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            raise ValueError(f"No executor available for mode: {mode}")
+
+        logger.info(f"Starting {name} {mode} executor with {max_workers} workers")
+        return executor
+
+    return _executors.get((name, mode, max_workers), _start)
+
+
+def get_client(address=None):
+    """Return the shared `dask.distributed` client, connecting on first use.
+
+    Connects to the scheduler at `address`, falling back to `scheduler_address` in the
+    `[processor]` section of the config. If neither is set, a `LocalCluster` with
+    `max_workers` single-threaded worker processes is started instead.
+    """
+    global _client
 
-def dispatch(operation, dset, **kwargs):
-    """Dispatch the operation to the correct mode (serial or parallel)."""
-    logger.info("NOW SENDING TO PARALLEL DISPATCH MODE...")
-    return process(operation, dset, mode="serial", **kwargs)
+    from dask.distributed import Client, LocalCluster
+
+    address = address or config_().get("processor", {}).get("scheduler_address")
+
+    with _client_lock:
+        if _client is None or _client.status != "running":
+            if address:
+                logger.info(f"Connecting to dask scheduler at {address}")
+                _client = Client(address)
+            else:
+                n_workers = get_max_workers()
+                logger.info(f"Starting dask LocalCluster with {n_workers} workers")
+                # worker processes, as the netCDF4 library is not thread-safe
+                cluster = LocalCluster(
+                    n_workers=n_workers, threads_per_worker=1, processes=True
+                )
+                _client = Client(cluster)
+
+        return _client
+
+
+def shutdown_executors(wait=True):
+    """Shut down all shared executors and the dask client."""
+    global _client
+
+    for executor in _executors.clear():
+        executor.shutdown(wait=wait)
+
+    with _client_lock:
+        if _client is not None:
+            cluster = _client.cluster
+            _client.close()
+            if cluster is not None:
+                cluster.close()
+            _client = None
+
+
+def _check_local_mode(mode):
+    # open datasets would be read here and sent to the cluster, so are not run on dask
+    if mode == "dask":
+        raise ValueError(
+            "Open datasets cannot be processed in dask mode. Use imap_cluster or "
+            "dispatch_to_cluster with the file paths of the datasets, so that they "
+            "are opened on the cluster workers."
+        )
+
+
+def _items(collection):
+    if isinstance(collection, collections.abc.Mapping):
+        return collection.items()
+    return collection
+
+
+def _collect(outputs):
+    results = collections.OrderedDict()
+    errors = collections.OrderedDict()
+
+    for dset, result, err in outputs:
+        if err is None:
+            results[dset] = result
+        else:
+            errors[dset] = err
+
+    return results, errors
+
+
+def imap(operation, collection, mode=None, max_workers=None, **kwargs):
+    """Lazily run the operation over each dataset in the collection.
+
+    Datasets are pulled from `collection` only as workers become free, so at most
+    `max_workers` datasets are in flight at any time.
+
+    :param operation: The operation callable, e.g. `clisops.ops.subset.subset`.
+    :param collection: Ordered dictionary, or iterable of pairs, of ds ids and their datasets.
+                       A dataset that could not be opened may be given as the exception
+                       raised, which is then yielded as the exception of that dataset.
+    :param mode: One of "serial", "threads" or "processes". Defaults to the configured mode.
+    :param max_workers: Size of the worker pool. Defaults to the configured number of workers.
+    :param kwargs: Arguments passed to the operation.
+    :return: Generator of (ds id, result, exception) tuples in collection order.
+    """
+    mode = get_mode(mode)
+    _check_local_mode(mode)
+    op_name = operation.__name__
+
+    if mode == "serial":
+        for dset, ds in _items(collection):
+            if isinstance(ds, Exception):
+                yield dset, None, ds
+                continue
+
+            try:
+                result = process(operation, ds, mode=mode, **kwargs)
+            except Exception as err:
+                logger.error(f"Operation failed: {op_name} on {dset}: {err}")
+                yield dset, None, err
+            else:
+                yield dset, result, None
+        return
+
+    logger.info(f"NOW SENDING TO PARALLEL DISPATCH MODE [{mode}]...")
+    max_workers = get_max_workers(max_workers)
+    executor = get_executor(mode, max_workers)
+    in_flight = collections.deque()
+
+    def _next_output():
+        dset, future = in_flight.popleft()
+        try:
+            return dset, future.result(), None
+        except Exception as err:
+            logger.error(f"Operation failed: {op_name} on {dset}: {err}")
+            return dset, None, err
+
+    try:
+        for dset, ds in _items(collection):
+            if len(in_flight) >= max_workers:
+                yield _next_output()
+
+            if isinstance(ds, Exception):
+                future = Future()
+                future.set_exception(ds)
+            else:
+                logger.info(
+                    f"Submitting {op_name} [{mode}]: on {dset} with args: {kwargs}"
+                )
+                future = executor.submit(operation, ds, **kwargs)
+
+            in_flight.append((dset, future))
+
+        while in_flight:
+            yield _next_output()
+
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
+
+def dispatch(operation, collection, mode=None, max_workers=None, **kwargs):
+    """Dispatch the operation over each dataset in the collection to a pool of workers.
+
+    :param operation: The operation callable, e.g. `clisops.ops.subset.subset`.
+    :param collection: Ordered dictionary, or iterable of pairs, of ds ids and their datasets.
+    :param mode: One of "threads" or "processes". Defaults to the configured mode.
+    :param max_workers: Size of the worker pool. Defaults to the configured number of workers.
+    :param kwargs: Arguments passed to the operation.
+    :return: Two ordered dictionaries, in collection order: the results of each
+             successful task and the exception raised by each failed task.
+    """
+    return _collect(imap(operation, collection, mode, max_workers, **kwargs))
+
+
+def run(operation, dset, file_paths, apply_fixes=True, fix=None, **kwargs):
+    """Open and fix a dataset, then run the processing operation on it.
+
+    This is the unit of work sent to a `dask.distributed` worker so that the data is
+    read, fixed and written on the worker rather than in the calling process.
+    The inputs of the dataset and the time taken to open it are added to the metrics
+    of the result, if it has any. `fix` is a `daops.utils.fixer.Fixer` that has
+    already been looked up for the dataset, otherwise the fixes are looked up here.
+    """
+    metrics = input_metrics(file_paths)
+    with timer(metrics, "open"):
+        ds = open_dataset(dset, file_paths, apply_fixes, fix)
+
+    result = process(operation, ds, mode="serial", **kwargs)
+    if isinstance(getattr(result, "metrics", None), dict):
+        result.metrics.update(metrics)
+    return result
+
+
+def imap_cluster(operation, collection, apply_fixes=True, client=None, **kwargs):
+    """Run the operation over each dataset in the collection on a `dask.distributed` cluster.
+
+    Results are streamed back as the futures complete and yielded in collection order.
+
+    :param operation: The operation callable, e.g. `clisops.ops.subset.subset`.
+    :param collection: Ordered dictionary of ds ids and their related file paths.
+    :param apply_fixes: Boolean. If True fixes will be applied to datasets if needed. Default is True.
+    :param client: A `dask.distributed.Client`. Defaults to the shared client from `get_client`.
+    :param kwargs: Arguments passed to the operation.
+    :return: Generator of (ds id, result, exception) tuples in collection order.
+    """
+    from dask.distributed import as_completed
+
+    client = client or get_client()
+    op_name = operation.__name__
+
+    logger.info(f"NOW SENDING TO PARALLEL DISPATCH MODE [dask]: {client}")
+
+    futures = collections.OrderedDict()
+    for dset, file_paths in collection.items():
+        logger.info(f"Submitting {op_name} [dask]: on {dset} with args: {kwargs}")
+        futures[dset] = client.submit(
+            run,
+            operation,
+            dset,
+            file_paths,
+            apply_fixes,
+            key=f"{op_name}-{dset}-{uuid.uuid4().hex}",
+            **kwargs,
+        )
+
+    dsets = {future.key: dset for dset, future in futures.items()}
+    pending = collections.deque(futures)
+    completed = {}
+
+    try:
+        for future in as_completed(futures.values()):
+            dset = dsets[future.key]
+            try:
+                completed[dset] = future.result(), None
+                logger.info(f"Completed {op_name} on {dset}: {completed[dset][0]}")
+            except Exception as err:
+                logger.error(f"Operation failed: {op_name} on {dset}: {err}")
+                completed[dset] = None, err
+
+            while pending and pending[0] in completed:
+                dset = pending.popleft()
+                yield (dset, *completed.pop(dset))
+
+    finally:
+        for dset in pending:
+            futures[dset].cancel()
+
+
+def dispatch_to_cluster(operation, collection, apply_fixes=True, client=None, **kwargs):
+    """Dispatch the operation over each dataset in the collection to a `dask.distributed` cluster.
+
+    :param operation: The operation callable, e.g. `clisops.ops.subset.subset`.
+    :param collection: Ordered dictionary of ds ids and their related file paths.
+    :param apply_fixes: Boolean. If True fixes will be applied to datasets if needed. Default is True.
+    :param client: A `dask.distributed.Client`. Defaults to the shared client from `get_client`.
+    :param kwargs: Arguments passed to the operation.
+    :return: Two ordered dictionaries, in collection order: the results of each
+             successful task and the exception raised by each failed task.
+    """
+    return _collect(
+        imap_cluster(operation, collection, apply_fixes, client=client, **kwargs)
+    )
 
 
 def process(operation, dset, mode="serial", **kwargs):
-    """Run the processing operation on the dataset in the correct mode (in series or parallel)."""
+    """Run the processing operation on the dataset in the correct mode (in series or parallel).
+
+    The mode is one of "serial", "threads" or "processes". Use `imap_cluster` to run
+    operations on a `dask.distributed` cluster.
+    """
+    _check_local_mode(mode)
     op_name = operation.__name__
 
     if mode == "serial":
@@ -22,6 +332,9 @@ def process(operation, dset, mode="serial", **kwargs):
     #        except Exception as err:
     #            raise Exception(f'Operation failed: {op_name} on {dset} with args: {kwargs}')
     else:
-        result = dispatch(operation, dset, **kwargs)
+        results, errors = dispatch(operation, {"dset": dset}, mode=mode, **kwargs)
+        if errors:
+            raise errors["dset"]
+        result = results["dset"]
 
     return result
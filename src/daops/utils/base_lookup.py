@@ -8,18 +8,40 @@ from elasticsearch import Elasticsearch
 
 from daops import config_
 
+from .shared import SharedObjects
+
+# connections must not be shared with a forked worker process
+_clients = SharedObjects(per_process=True)
+
+
+def get_es_client():
+    """Return the Elasticsearch client for the configured endpoint.
+
+    One client is shared per endpoint across the process (and its threads) so that
+    its pool of keep-alive connections is reused between lookups.
+    Pool size, timeout and retries are read from the `[elasticsearch]` section of the config.
+    """
+    es_config = config_()["elasticsearch"]
+    url = f"https://{es_config['endpoint']}:{es_config['port']}"
+
+    return _clients.get(
+        url,
+        lambda: Elasticsearch(
+            url,
+            connections_per_node=es_config.get("connections_per_node", 10),
+            request_timeout=es_config.get("request_timeout", 10),
+            max_retries=es_config.get("max_retries", 3),
+            retry_on_timeout=True,
+        ),
+    )
+
 
 class Lookup:
     """Base class used for looking up datasets in the elasticsearch indexes."""
 
     def __init__(self, dset):  # noqa: D107
         self.dset = dset
-        self.es = Elasticsearch(
-            "https://"
-            + config_()["elasticsearch"]["endpoint"]
-            + ":"
-            + config_()["elasticsearch"]["port"],
-        )
+        self.es = get_es_client()
 
     def convert_to_ds_id(self):
         """Convert the input dataset to a drs id form to use with the elasticsearch index."""
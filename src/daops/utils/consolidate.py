@@ -1,9 +1,13 @@
 """Consolidate file paths for each dataset in a collection."""
 
+import bisect
 import collections
+import glob
 import os
 import re
 
+import cftime
+import h5netcdf
 from clisops.exceptions import InvalidCollection
 from clisops.project_utils import (
     derive_ds_id,
@@ -14,8 +18,18 @@ from clisops.utils.dataset_utils import is_kerchunk_file, open_xr_dataset
 from clisops.utils.file_utils import FileMapper
 from loguru import logger
 
+from daops import config_
 from daops.catalog import get_catalog
+from daops.catalog.util import (
+    parse_time,
+    parse_time_components,
+    span_matches_components,
+    to_time_key,
+)
+from daops.processor import get_executor
 from daops.utils.core import _wrap_sequence
+from daops.utils.file_index import MISSING, get_file_index
+from daops.utils.file_list_cache import get_file_list_cache
 
 
 def to_year(time_string):
@@ -33,35 +47,172 @@ def get_year(value, default):
     return default
 
 
-def get_years_from_file(fpath):
-    """Attempt to extract years from a file.
+def _decode_attr(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
 
-    First by examining the file name. If that doesn't work then it
-    reads the file contents and looks at the time axis.
+def get_time_span_from_name(fpath):
+    """Get the time span given by the dates at the end of a file name, e.g. `_185001-201412`.
 
-    Returns a set of years.
+    Dates are read to whatever precision they are given in. The start is padded
+    to the earliest time and the end to the latest time that they could mean, so
+    `_185001-201412` spans from the start of January 1850 to the end of December 2014.
+
+    Returns a tuple of (start, end) time keys, or None if the name holds no dates.
     """
-    # Try to use filename
     time_comps = os.path.splitext(os.path.basename(fpath))[0].split("_")[-1].split("-")
-    years = {int(tm[:4]) for tm in time_comps if re.match(r"^\d{4,}", tm)}
+    dates = [
+        match.group()[:14]
+        for match in (re.match(r"^\d{4,}", tm) for tm in time_comps)
+        if match
+    ]
+
+    if not dates:
+        return None
+
+    return (
+        min(int(date.ljust(14, "0")) for date in dates),
+        max(int(date.ljust(14, "9")) for date in dates),
+    )
+
+
+def get_time_span_from_header(fpath):
+    """Read the first and last times of the time axis of a netCDF4/HDF5 file.
+
+    Only the first and last values of the time variable, and its `units` and
+    `calendar` attributes, are read; no xarray Dataset is built.
+    Files that are not HDF5 based (e.g. netCDF3) raise an exception.
+
+    Returns a tuple of (start, end) time keys, or None if the file has no time axis.
+    """
+    with h5netcdf.File(fpath, "r") as nc:
+        if "time" not in nc.variables:
+            return None
+
+        time_var = nc.variables["time"]
+        if time_var.shape == ():
+            values = [time_var[()]]
+        elif time_var.shape[0] == 0:
+            return None
+        else:
+            values = [time_var[0], time_var[-1]]
+
+        units = _decode_attr(time_var.attrs["units"])
+        calendar = _decode_attr(time_var.attrs.get("calendar", "standard"))
+
+    keys = [int(to_time_key(dt)) for dt in cftime.num2date(values, units, calendar)]
+    return min(keys), max(keys)
 
-    # If a range of years
-    if len(years) > 1:
-        years = set(range(min(years), max(years) + 1))
 
-    # If no years, try reading the file
-    if not years:
-        ds = open_xr_dataset(fpath)
-        if hasattr(ds, "time"):
-            years = {int(yr) for yr in ds.time.dt.year}
+def get_time_span_from_file(fpath, index=None):
+    """Attempt to extract the time span of a file.
 
-    return years
+    First by examining the file name. If that doesn't work then it looks the file up
+    in the file index or, failing that, reads the first and last values of the
+    time axis from the file. The span read from the file is recorded in the file index so that
+    the file is not opened again.
 
+    Returns a tuple of (start, end) time keys (see `daops.catalog.util.to_time_key`),
+    or None if the file has no time axis.
+    """
+    # Try to use filename
+    time_span = get_time_span_from_name(fpath)
+    if time_span:
+        return time_span
+
+    # If no dates, try the file index
+    if index is None:
+        index = get_file_index()
+    time_span = index.get(fpath) if index is not None else MISSING
+
+    if time_span is MISSING:
+        # try reading the file
+        try:
+            time_span = get_time_span_from_header(fpath)
+        except Exception as err:
+            logger.debug(f"Could not read time axis of {fpath} directly: {err}")
+            ds = open_xr_dataset(fpath)
+            time_span = None
+            if hasattr(ds, "time") and ds.time.size > 0:
+                time_span = (
+                    int(to_time_key(ds.time.values.min())),
+                    int(to_time_key(ds.time.values.max())),
+                )
+
+        if index is not None:
+            index.set(fpath, time_span)
+
+    return time_span
+
+
+def get_years_from_file(fpath, index=None):
+    """Attempt to extract years from a file.
+
+    Returns a set of the years in the time span of the file (see `get_time_span_from_file`).
+    """
+    time_span = get_time_span_from_file(fpath, index=index)
+    if not time_span:
+        return set()
 
-def get_files_matching_time_range(time_param, file_paths):
-    """Examine each file to see if it contains years that are in the requested range.
+    start, end = (key // 10**10 for key in time_span)
+    return set(range(start, end + 1))
 
-    Uses the settings in `time_param`.
+
+def build_file_index(paths, index_path=None):
+    """Scan data files and record the time spans they hold in the file index.
+
+    Files whose names contain their dates are skipped because they are never opened.
+
+    :param paths: (list) Paths of files or of directories to search for netCDF files.
+    :param index_path: Path of the file index. Defaults to `file_index_path` in the
+                       `[consolidate]` section of the config.
+    :return: The number of files added to the index.
+    """
+    index = get_file_index(index_path)
+    if index is None:
+        raise ValueError("No file index path has been configured.")
+
+    count = 0
+    for path in _wrap_sequence(paths):
+        if os.path.isdir(path):
+            fpaths = sorted(glob.glob(os.path.join(path, "**", "*.nc"), recursive=True))
+        else:
+            fpaths = [path]
+
+        for fpath in fpaths:
+            # files with dates in their names are skipped without touching the index
+            if get_time_span_from_name(fpath):
+                continue
+
+            if index.get(fpath) is MISSING:
+                get_time_span_from_file(fpath, index=index)
+                count += index.get(fpath) is not MISSING
+
+    logger.info(f"Indexed {count} files in {index.path}")
+    return count
+
+
+def probe_time_spans(file_paths):
+    """Get the time span of each file, in the same order as `file_paths`.
+
+    Files are examined concurrently by a pool of threads of the size set by
+    `max_workers` in the `[consolidate]` section of the config.
+    """
+    max_workers = config_().get("consolidate", {}).get("max_workers", 1)
+
+    if max_workers <= 1 or len(file_paths) <= 1:
+        return [get_time_span_from_file(fpath) for fpath in file_paths]
+
+    executor = get_executor("threads", max_workers, name="io")
+    return list(executor.map(get_time_span_from_file, file_paths))
+
+
+def get_files_matching_time_range(time_param, file_paths, time_components=None):
+    """Examine each file to see if it contains times that are in the requested range.
+
+    Uses the settings in `time_param` and, if given, `time_components`.
 
     The `time_param` can have three types:
         1. type: "interval":
@@ -71,52 +222,130 @@ def get_files_matching_time_range(time_param, file_paths):
         3. type: "none":
            - undefined
 
-    It attempts to filter out files that do not match the selected year.
+    It attempts to filter out files that do not match the selected times, to the
+    precision of the dates in the file names (e.g. months for `_185001-201412`).
+    Files that cannot hold any of the requested years and months in
+    `time_components` are filtered out too.
     For any file that we cannot do this with, the file will be read by xarray.
 
     Args:
         time_param (TimeParameter): time parameter of requested date/times
         file_paths (list): list of file paths
+        time_components (TimeComponentsParameter): time components of requested date/times
     Returns:
         file_paths (list): filtered list of file paths
 
     """
+    components = parse_time_components(time_components)
+    time_type = time_param.type if time_param else "none"
+
     # Return all file paths if no time inputs specified
-    if time_param.type == "none":
+    if time_type == "none" and not components:
         return file_paths
 
     logger.info(f"Testing {len(file_paths)} files in time range: ...")
     files_in_time_range = []
 
     # Handle times differently depending on the type of time parameter
-    if time_param.type == "interval":
-        tp_start, tp_end = time_param.get_bounds()
-        req_start_year = get_year(tp_start, default=-99999999)
-        req_end_year = get_year(tp_end, default=999999999)
-
-        # Work through the list of file paths checking if each matches
-        for fpath in file_paths:
-            years = get_years_from_file(fpath)
-            if min(years) <= req_end_year and max(years) >= req_start_year:
-                files_in_time_range.append(fpath)
-
-    elif time_param.type == "series":
-        # Get requested years and match to files whose years intersect
-        req_years = {to_year(tm) for tm in time_param.asdict().get("time_values", [])}
-
-        for fpath in file_paths:
-            years = get_years_from_file(fpath)
-            if req_years.intersection(years):
-                files_in_time_range.append(fpath)
+    if time_type == "none":
+
+        def matches(start, end):
+            return True
+
+    elif time_type == "interval":
+        start, end = parse_time(time_param)
+        req_start, req_end = to_time_key(start), to_time_key(end)
+
+        def matches(start, end):
+            return start <= req_end and end >= req_start
+
+    elif time_type == "series":
+        # Match files whose span holds any of the requested times
+        req_times = sorted(
+            to_time_key(tm) for tm in time_param.asdict().get("time_values", [])
+        )
+
+        def matches(start, end):
+            i = bisect.bisect_left(req_times, start)
+            return i < len(req_times) and req_times[i] <= end
+
+    # Work through the list of file paths checking if each matches.
+    # Files without a time axis are kept.
+    for fpath, time_span in zip(file_paths, probe_time_spans(file_paths), strict=True):
+        if time_span is None or (
+            matches(*time_span) and span_matches_components(*time_span, components)
+        ):
+            files_in_time_range.append(fpath)
 
     logger.info(f"Kept {len(files_in_time_range)} files")
     return files_in_time_range
 
 
+def get_filepaths(dset):
+    """Find the file paths of a dataset, using the file list cache for dataset ids and paths.
+
+    The cache is configured by `cache_maxsize` in the `[consolidate]` section of the config.
+    """
+    cache = get_file_list_cache()
+    if cache is None or not isinstance(dset, str):
+        return dset_to_filepaths(dset, force=True)
+
+    file_paths = cache.get(dset)
+    if file_paths is None:
+        file_paths = dset_to_filepaths(dset, force=True)
+        cache.set(dset, file_paths)
+
+    return file_paths
+
+
+def _consolidate_dataset(dset, time_param=None, time_components=None):
+    """Find the file paths of a dataset that is not in a catalog, filtered by time."""
+    file_paths = get_filepaths(dset)
+
+    if time_param or time_components:
+        file_paths = get_files_matching_time_range(
+            time_param, file_paths, time_components
+        )
+
+    # If no files are matched then raise an exception
+    if len(file_paths) == 0:
+        raise Exception(f"No files found in given time range for {dset}")
+
+    return file_paths
+
+
+def _consolidate_from_catalog(
+    catalog, collection, time_param=None, time_components=None
+):
+    """Find the file paths of each dataset in a catalog with a single search."""
+    ds_ids = list(dict.fromkeys(derive_ds_id(dset) for dset in collection))
+    result = catalog.search(
+        collection=ds_ids, time=time_param, time_components=time_components
+    )
+
+    for dset in collection:
+        ds_id = derive_ds_id(dset)
+        if ds_id in result.records:
+            continue
+
+        if len(catalog.search(collection=ds_id, time=None)) > 0:
+            raise Exception(f"No files found in given time range for {dset}")
+        else:
+            raise InvalidCollection(f"{dset} is not in the list of available data.")
+
+    logger.info(f"Found {len(result)} datasets")
+    return result.files()
+
+
 def consolidate(collection, **kwargs):
     """Find the file paths relating to each input dataset.
 
-    If a time range has been supplied then only the files relating to this time range are recorded.
+    If a time range or time components have been supplied then only the files relating to
+    them are recorded.
+
+    Duplicate datasets are only looked up once. Datasets that are not in a catalog are
+    looked up concurrently by a pool of threads of the size set by `max_workers` in
+    the `[consolidate]` section of the config.
 
     :param collection: (clisops.parameter.CollectionParameter) The collection of datasets to process.
     :param kwargs: Arguments of the operation taking place e.g. subset, average, or re-grid.
@@ -124,9 +353,8 @@ def consolidate(collection, **kwargs):
              relating to it.
     """
     catalog = None
-    # time = None
 
-    collection = _wrap_sequence(collection.value)
+    collection = list(dict.fromkeys(_wrap_sequence(collection.value)))
 
     if not isinstance(collection[0], FileMapper) and not is_kerchunk_file(
         collection[0]
@@ -134,45 +362,40 @@ def consolidate(collection, **kwargs):
         project = get_project_name(collection[0])
         catalog = get_catalog(project)
 
-    filtered_refs = collections.OrderedDict()
-
     time_param = kwargs.get("time")
+    time_components = kwargs.get("time_components")
 
-    for dset in collection:
-
-        # If dset looks like a Kerchunk file then pass it straight through
-        if is_kerchunk_file(dset):
-            filtered_refs[dset] = dset
+    # If dset looks like a Kerchunk file then pass it straight through
+    dsets = [dset for dset in collection if not is_kerchunk_file(dset)]
 
-        # If no intake catalog is being used to constrain the data access
-        elif not catalog:
-            file_paths = dset_to_filepaths(dset, force=True)
+    # If an intake catalog is being used to constrain the data access
+    if catalog:
+        refs = _consolidate_from_catalog(catalog, dsets, time_param, time_components)
 
-            if time_param:
-                file_paths = get_files_matching_time_range(time_param, file_paths)
+    # If no intake catalog is being used to constrain the data access
+    else:
+        max_workers = config_().get("consolidate", {}).get("max_workers", 1)
 
-            # If no files are matched then raise an exception
-            if len(file_paths) == 0:
-                raise Exception(f"No files found in given time range for {dset}")
+        def _consolidate(dset):
+            return _consolidate_dataset(dset, time_param, time_components)
 
-            filtered_refs[dset] = file_paths
-
-        # If an intake catalog is being used to constrain the data access
+        if max_workers <= 1 or len(dsets) <= 1:
+            file_paths = map(_consolidate, dsets)
         else:
-            ds_id = derive_ds_id(dset)
-            result = catalog.search(collection=ds_id, time=time_param)
-
-            if len(result) == 0:
-                result = catalog.search(collection=ds_id, time=None)
-                if len(result) > 0:
-                    raise Exception(f"No files found in given time range for {dset}")
-                else:
-                    raise InvalidCollection(
-                        f"{dset} is not in the list of available data."
-                    )
+            # a separate pool from "io", which the time filtering of each dataset waits on
+            executor = get_executor("threads", max_workers, name="consolidate")
+            file_paths = executor.map(_consolidate, dsets)
 
-            logger.info(f"Found {len(result)} files")
+        refs = dict(zip(dsets, file_paths, strict=True))
 
-            filtered_refs = result.files()
+    filtered_refs = collections.OrderedDict()
+    for dset in collection:
+        if is_kerchunk_file(dset):
+            filtered_refs[dset] = dset
+        elif catalog:
+            ds_id = derive_ds_id(dset)
+            filtered_refs[ds_id] = refs[ds_id]
+        else:
+            filtered_refs[dset] = refs[dset]
 
     return filtered_refs
@@ -1,6 +1,7 @@
 """Utility functions for the DAOPS package."""
 
 import collections
+import threading
 
 from clisops.utils.dataset_utils import is_kerchunk_file, open_xr_dataset
 from elasticsearch import exceptions
@@ -8,8 +9,12 @@ from loguru import logger
 
 from daops import config_
 from daops.utils import fixer
+from daops.utils.post_processor import apply_post_processors
 
-from .base_lookup import Lookup
+from .base_lookup import Lookup, get_es_client
+
+# the netCDF4/HDF5 libraries are not thread-safe, so files are opened one at a time
+_open_lock = threading.Lock()
 
 
 def _wrap_sequence(obj):
@@ -34,6 +39,28 @@ class Characterised(Lookup):
         except exceptions.NotFoundError:
             return False
 
+    @classmethod
+    def for_collection(cls, dsets):
+        """Look up whether every dataset in a collection has been characterised with a single request.
+
+        :param dsets: Sequence of dataset identifiers.
+        :return: An ordered dictionary of each dataset and whether it exists in the store.
+        """
+        ids = collections.OrderedDict(
+            (dset, Lookup(dset)._convert_id(dset)) for dset in dsets
+        )
+        if not ids:
+            return collections.OrderedDict()
+
+        response = get_es_client().mget(
+            index=config_()["elasticsearch"]["character_store"],
+            ids=list(dict.fromkeys(ids.values())),
+            source=False,
+        )
+        found = {doc["_id"] for doc in response["docs"] if doc.get("found")}
+
+        return collections.OrderedDict((dset, id in found) for dset, id in ids.items())
+
 
 def is_characterised(collection, require_all=False):
     """Intake a collection (an individual data reference or a sequence of them).
@@ -48,49 +75,48 @@ def is_characterised(collection, require_all=False):
     :return: Ordered Dictionary OR Boolean (if `require_all` is True)
     """
     collection = _wrap_sequence(collection)
-    resp = collections.OrderedDict()
-
-    for dset in collection:
-        _is_char = Characterised(dset).lookup_characterisation()
-
-        if require_all and not _is_char:
-            return False
+    resp = Characterised.for_collection(collection)
 
-        resp[dset] = Characterised(dset).lookup_characterisation()
+    if require_all and not all(resp.values()):
+        return False
 
     return resp
 
 
-def open_dataset(ds_id, file_paths, apply_fixes=True):
+def open_dataset(ds_id, file_paths, apply_fixes=True, fix=None):
     """Open an xarray Dataset and apply fixes if requested.
 
     Fixes are applied to the data either before or after the dataset is opened.
     Whether a fix is a 'pre-processor' or 'post-processor' is defined in the
-    fix itself.
+    fix itself. Datasets are opened one at a time in each process, as the netCDF4
+    library is not thread-safe, and may then be processed concurrently.
 
     :param ds_id: Dataset identifier in the form of a drs id
                   e.g. cmip5.output1.INM.inmcm4.rcp45.mon.ocean.Omon.r1i1p1.latest.zostoga
     :param file_paths: (list) The file paths corresponding to the ds id.
     :param apply_fixes: Boolean. If True fixes will be applied to datasets if needed. Default is True.
+    :param fix: A `daops.utils.fixer.Fixer` that has already been looked up for the ds id.
+                If None the fixes are looked up here.
     :return: xarray Dataset with fixes applied to the data.
     """
     if apply_fixes and not is_kerchunk_file(ds_id):
-        fix = fixer.Fixer(ds_id)
+        fix = fix or fixer.Fixer(ds_id)
         if fix.pre_processor:
             for pre_process in fix.pre_processors:
                 logger.info(f"Loading data with pre_processor: {pre_process.__name__}")
         else:
             logger.info("Loading data")
 
-        ds = open_xr_dataset(file_paths, preprocess=fix.pre_processor)
+        with _open_lock:
+            ds = open_xr_dataset(file_paths, preprocess=fix.pre_processor)
 
         if fix.post_processors:
-            for post_process in fix.post_processors:
-                func, operands = post_process
+            for func, _ in fix.post_processors:
                 logger.info(f"Running post-processing function: {func.__name__}")
-                ds = func(ds_id, ds, **operands)
+            ds = apply_post_processors(ds_id, ds, fix.post_processors)
 
     else:
-        ds = open_xr_dataset(file_paths)
+        with _open_lock:
+            ds = open_xr_dataset(file_paths)
 
     return ds
@@ -0,0 +1,108 @@
+"""Persistent index of the time span held in each data file."""
+
+import os
+import sqlite3
+import threading
+
+from daops import config_
+
+from .shared import ProcessLocal, SharedObjects
+
+MISSING = object()
+
+
+class FileIndex:
+    """Index of the time span of data files, keyed on their path.
+
+    Spans are held as (start, end) time keys of the form YYYYMMDDhhmmss
+    (see `daops.catalog.util.to_time_key`). Each entry records the modification
+    time and size of the file when it was indexed, and is ignored once the file
+    has changed. Files without a time axis are recorded with a time span of `None`.
+    """
+
+    def __init__(self, path):  # noqa: D107
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._db = ProcessLocal(self._open_db)
+
+    def _open_db(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS time_spans "
+            "(path TEXT PRIMARY KEY, mtime REAL, size INTEGER, start INTEGER, end INTEGER)"
+        )
+        return db
+
+    def _connect(self):
+        return self._db.get()
+
+    @staticmethod
+    def _stat(fpath):
+        st = os.stat(fpath)
+        return st.st_mtime, st.st_size
+
+    def get(self, fpath):
+        """Return the (start, end) time span of `fpath`, `None` if it has no time axis, or `MISSING`."""
+        try:
+            stat = self._stat(fpath)
+        except OSError:
+            return MISSING
+
+        with self._lock:
+            entry = self._entries.get(fpath)
+            if entry is None:
+                entry = (
+                    self._connect()
+                    .execute(
+                        "SELECT mtime, size, start, end FROM time_spans WHERE path = ?",
+                        (fpath,),
+                    )
+                    .fetchone()
+                )
+                if entry is not None:
+                    self._entries[fpath] = entry
+
+        if entry is None or tuple(entry[:2]) != stat:
+            return MISSING
+
+        return None if entry[2] is None else (entry[2], entry[3])
+
+    def set(self, fpath, time_span):
+        """Record the (start, end) time span of `fpath`, or `None` if it has no time axis."""
+        try:
+            stat = self._stat(fpath)
+        except OSError:
+            return
+
+        start, end = time_span or (None, None)
+        entry = (*stat, start, end)
+
+        with self._lock:
+            self._entries[fpath] = entry
+            with self._connect() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO time_spans VALUES (?, ?, ?, ?, ?)",
+                    (fpath, *entry),
+                )
+
+    def __len__(self):  # noqa: D105
+        with self._lock:
+            return (
+                self._connect().execute("SELECT COUNT(*) FROM time_spans").fetchone()[0]
+            )
+
+
+_indexes = SharedObjects()
+
+
+def get_file_index(path=None):
+    """Return the file index at `path`, or at `file_index_path` in the `[consolidate]` section of the config.
+
+    Returns None if no path is configured.
+    """
+    path = path or config_().get("consolidate", {}).get("file_index_path")
+    if not path:
+        return None
+
+    return _indexes.get(path, lambda: FileIndex(path))
@@ -0,0 +1,87 @@
+"""Cache of the file paths that datasets resolve to."""
+
+import collections
+import os
+import threading
+
+from daops import config_
+
+from .shared import SharedObjects
+
+
+class FileListCache:
+    """Least-recently-used cache of the file paths of datasets, keyed on the dataset id.
+
+    Each entry records the modification time of the directories holding the files
+    when it was cached, and is ignored once any of them has changed, e.g. because
+    a file has been added or removed.
+    """
+
+    def __init__(self, maxsize=1024):  # noqa: D107
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_dirs(dirs):
+        try:
+            return tuple(os.stat(d).st_mtime_ns for d in dirs)
+        except OSError:
+            return None
+
+    def get(self, ds_id):
+        """Return the cached file paths of `ds_id`, or None if they are not cached."""
+        with self._lock:
+            entry = self._entries.get(ds_id)
+
+        # stat outside the lock so that slow file systems do not serialise lookups
+        if entry is not None and self._stat_dirs(entry[0]) == entry[1]:
+            with self._lock:
+                if ds_id in self._entries:
+                    self._entries.move_to_end(ds_id)
+                self.hits += 1
+            return list(entry[2])
+
+        with self._lock:
+            self._entries.pop(ds_id, None)
+            self.misses += 1
+        return None
+
+    def set(self, ds_id, file_paths):
+        """Cache the file paths of `ds_id`. Empty lists of file paths are not cached."""
+        if not file_paths or self.maxsize <= 0:
+            return
+
+        dirs = sorted({os.path.dirname(fpath) for fpath in file_paths})
+        mtimes = self._stat_dirs(dirs)
+        if mtimes is None:
+            return
+
+        with self._lock:
+            self._entries[ds_id] = dirs, mtimes, tuple(file_paths)
+            self._entries.move_to_end(ds_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+_cache = SharedObjects()
+
+
+def get_file_list_cache():
+    """Return the file list cache, configured from the `[consolidate]` section of the config.
+
+    Returns None if `cache_maxsize` is 0.
+    """
+    maxsize = config_().get("consolidate", {}).get("cache_maxsize", 1024)
+    if maxsize <= 0:
+        return None
+
+    return _cache.get(None, lambda: FileListCache(maxsize=maxsize))
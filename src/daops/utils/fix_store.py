@@ -0,0 +1,216 @@
+"""Stores that the fix documents for datasets are retrieved from."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from elasticsearch import exceptions
+from loguru import logger
+
+from daops import config_
+
+from .base_lookup import get_es_client
+from .shared import ProcessLocal, SharedObjects
+
+DUMP_FORMATS = (
+    "a JSON list of documents, a single JSON document, "
+    "or JSON lines with one document per line"
+)
+
+
+class FixStore:
+    """Base class for a store of fix documents, keyed on the md5 id of the dataset.
+
+    Fix documents are returned in the form ``{"_source": {"fixes": [...]}}``,
+    or as `None` if the dataset has no fixes.
+    """
+
+    def get(self, id):
+        """Return the fix document for `id`, or `None` if it has no fixes."""
+        return self.mget([id])[id]
+
+    def mget(self, ids):
+        """Return a dictionary of each id and its fix document, or `None` if it has no fixes."""
+        raise NotImplementedError
+
+
+class ElasticsearchFixStore(FixStore):
+    """Fix store backed by the `fix_store` index on Elasticsearch."""
+
+    def __init__(self, index=None):  # noqa: D107
+        self.index = index or config_()["elasticsearch"]["fix_store"]
+
+    def get(self, id):  # noqa: D102
+        try:
+            doc = get_es_client().get(index=self.index, id=id)
+            return {"_source": doc["_source"]}
+        except exceptions.NotFoundError:
+            return None
+
+    def mget(self, ids):  # noqa: D102
+        response = get_es_client().mget(index=self.index, ids=list(ids))
+
+        # a document that could not be retrieved has an "error" instead of "found",
+        # and must not be taken (and cached) as a dataset without fixes
+        errors = {
+            doc["_id"]: doc["error"] for doc in response["docs"] if "error" in doc
+        }
+        if errors:
+            raise Exception(f"Failed to retrieve fixes from {self.index} for: {errors}")
+
+        return {
+            doc["_id"]: {"_source": doc["_source"]} if doc["found"] else None
+            for doc in response["docs"]
+        }
+
+
+class LocalFixStore(FixStore):
+    """Fix store backed by a local sqlite snapshot of the `fix_store` index.
+
+    The snapshot is created with `LocalFixStore.build` from an export of the index.
+    """
+
+    def __init__(self, path):  # noqa: D107
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Fix store snapshot not found: {path}")
+
+        self.path = path
+        self._local = threading.local()
+
+    def _open_db(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    @property
+    def db(self):
+        """Read-only sqlite connection for the current thread."""
+        if not hasattr(self._local, "db"):
+            self._local.db = ProcessLocal(self._open_db)
+        return self._local.db.get()
+
+    def mget(self, ids):  # noqa: D102
+        ids = list(ids)
+        placeholders = ", ".join("?" * len(ids))
+        rows = self.db.execute(
+            f"SELECT id, source FROM fixes WHERE id IN ({placeholders})",  # noqa: S608
+            ids,
+        )
+        found = {id: {"_source": json.loads(source)} for id, source in rows}
+        return {id: found.get(id) for id in ids}
+
+    def __len__(self):  # noqa: D105
+        return self.db.execute("SELECT COUNT(*) FROM fixes").fetchone()[0]
+
+    @staticmethod
+    def _read_docs(dump_path):
+        """Read the documents of an index export in one of the `DUMP_FORMATS`."""
+        with open(dump_path) as fin:
+            content = fin.read().strip()
+
+        try:
+            docs = json.loads(content) if content else []
+        except json.JSONDecodeError:
+            try:
+                docs = [
+                    json.loads(line) for line in content.splitlines() if line.strip()
+                ]
+            except json.JSONDecodeError as err:
+                raise ValueError(
+                    f"Could not read fix documents from {dump_path}: {err}. "
+                    f"The export must be {DUMP_FORMATS}."
+                ) from err
+
+        if isinstance(docs, dict):
+            docs = [docs]
+
+        for doc in docs:
+            if not isinstance(doc, dict) or not isinstance(doc.get("_source"), dict):
+                raise ValueError(
+                    f"Not a fix document in {dump_path}: {doc!r}. Each document must "
+                    "have the `_source` of the index document, and the export must be "
+                    f"{DUMP_FORMATS}."
+                )
+
+        return docs
+
+    @classmethod
+    def build(cls, dump_paths, path):
+        """Build a snapshot at `path` from one or more exports of the `fix_store` index.
+
+        Each export is in one of the `DUMP_FORMATS`, and each document in it has the
+        `_id` and `_source` of the index document.
+        If `_id` is missing, it is derived from `dataset_id` in the `_source`.
+
+        :param dump_paths: (str or list) Paths of the exported documents.
+        :param path: Path of the sqlite snapshot to create.
+        :return: The `LocalFixStore` for the new snapshot.
+        """
+        if isinstance(dump_paths, (str, os.PathLike)):
+            dump_paths = [dump_paths]
+
+        rows = []
+        for dump_path in dump_paths:
+            for doc in cls._read_docs(dump_path):
+                source = doc["_source"]
+                id = doc.get("_id")
+                if not id:
+                    id = hashlib.md5(  # noqa: S324
+                        source["dataset_id"].encode("utf-8")
+                    ).hexdigest()
+                rows.append((id, json.dumps(source)))
+
+        tmp_path = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        with sqlite3.connect(tmp_path) as db:
+            db.execute("CREATE TABLE fixes (id TEXT PRIMARY KEY, source TEXT)")
+            db.executemany("INSERT OR REPLACE INTO fixes VALUES (?, ?)", rows)
+        db.close()
+
+        # replace any existing snapshot in one step so readers never see a partial one
+        os.replace(tmp_path, path)
+        return cls(path)
+
+
+def build_snapshot(dump_paths, snapshot_path=None):
+    """Build the snapshot used by the local fix store from exports of the `fix_store` index.
+
+    :param dump_paths: (str or list) Paths of the exported documents.
+    :param snapshot_path: Path of the snapshot. Defaults to `snapshot_path` in the
+                          `[fixer]` section of the config.
+    :return: The number of datasets with fixes in the snapshot.
+    """
+    snapshot_path = snapshot_path or config_().get("fixer", {}).get("snapshot_path")
+    if not snapshot_path:
+        raise ValueError("No fix store snapshot path has been configured.")
+
+    count = len(LocalFixStore.build(dump_paths, snapshot_path))
+    logger.info(f"Built fix store snapshot of {count} datasets at {snapshot_path}")
+    return count
+
+
+_stores = SharedObjects()
+
+
+def get_fix_store():
+    """Return the fix store selected by `fix_store` in the `[fixer]` section of the config.
+
+    `fix_store` is either "elasticsearch" (the default) or "local", in which case
+    the snapshot at `snapshot_path` is used.
+    """
+    fixer_config = config_().get("fixer", {})
+    store_type = fixer_config.get("fix_store") or "elasticsearch"
+
+    if store_type == "elasticsearch":
+        index = config_()["elasticsearch"]["fix_store"]
+        return _stores.get((store_type, index), lambda: ElasticsearchFixStore(index))
+
+    elif store_type == "local":
+        path = fixer_config.get("snapshot_path")
+        return _stores.get((store_type, path), lambda: LocalFixStore(path))
+
+    raise ValueError(
+        f"Unknown fix store: {store_type}. Must be one of: elasticsearch, local"
+    )
@@ -1,12 +1,128 @@
-"""Apply fixes to input dataset from the elastic search index."""
+"""Apply fixes to input dataset from the fix store."""
 
-from pydoc import locate
-
-from elasticsearch import exceptions
+import collections
+import functools
+import json
+import sqlite3
+import threading
+import time
 
 from daops import config_
+from daops.data_utils.common_utils import resolve
 
 from .base_lookup import Lookup
+from .fix_store import get_fix_store
+from .shared import ProcessLocal, SharedObjects
+
+MISSING = object()
+
+
+class FixCache:
+    """Least-recently-used cache of fix documents, keyed on the md5 id of the dataset.
+
+    Datasets without fixes are cached as `None` so that the (most common) not found
+    result is remembered too. Entries expire after `ttl` seconds.
+    If `path` is set, entries are also written to a sqlite database there so that
+    they survive a restart of the worker.
+    """
+
+    def __init__(self, ttl=3600, maxsize=1024, path=None):  # noqa: D107
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._db = ProcessLocal(self._open_db)
+
+    def _open_db(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS fixes "
+            "(id TEXT PRIMARY KEY, expires REAL, content TEXT)"
+        )
+        return db
+
+    def _connect(self):
+        return self._db.get()
+
+    def _load(self, id):
+        row = (
+            self._connect()
+            .execute("SELECT expires, content FROM fixes WHERE id = ?", (id,))
+            .fetchone()
+        )
+        if row:
+            return row[0], json.loads(row[1])
+        return None
+
+    def _store(self, id, expires, content):
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO fixes VALUES (?, ?, ?)",
+                (id, expires, json.dumps(content)),
+            )
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, id):
+        """Return the cached fix document for `id`, `None` if it has no fixes, or `MISSING`."""
+        with self._lock:
+            entry = self._entries.get(id)
+            if entry is None and self.path:
+                entry = self._load(id)
+
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(id, None)
+                self.misses += 1
+                return MISSING
+
+            self._entries[id] = entry
+            self._entries.move_to_end(id)
+            self._evict()
+            self.hits += 1
+            return entry[1]
+
+    def set(self, id, content):
+        """Cache the fix document for `id`, or `None` if it has no fixes."""
+        expires = time.time() + self.ttl
+
+        with self._lock:
+            self._entries[id] = expires, content
+            self._entries.move_to_end(id)
+            self._evict()
+
+            if self.path:
+                self._store(id, expires, content)
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            if self.path:
+                with self._connect() as db:
+                    db.execute("DELETE FROM fixes")
+
+
+_cache = SharedObjects()
+
+
+def get_fix_cache():
+    """Return the fix cache, configured from the `[fixer]` section of the config."""
+    fixer_config = config_().get("fixer", {})
+
+    return _cache.get(
+        None,
+        lambda: FixCache(
+            ttl=fixer_config.get("cache_ttl", 3600),
+            maxsize=fixer_config.get("cache_maxsize", 1024),
+            path=fixer_config.get("cache_path") or None,
+        ),
+    )
 
 
 class FuncChainer:
@@ -22,8 +138,33 @@ class FuncChainer:
         return result
 
 
+@functools.lru_cache(maxsize=1024)
+def compile_fixes(fixes):
+    """Resolve the fixes of a fix document into pre- and post-processors.
+
+    Compiled fixes are cached, keyed on the JSON encoded `fixes`, so that the
+    functions of a fix document are only resolved the first time it is seen.
+
+    :param fixes: The JSON encoded list of fixes of a fix document.
+    :return: A tuple of the pre-processor functions and a tuple of the
+             (function, operands) pairs of the post-processors.
+    """
+    pre_processors = []
+    post_processors = []
+
+    for fix in json.loads(fixes):
+        func = resolve(fix["reference_implementation"])
+
+        if fix["process_type"] == "post_processor":
+            post_processors.append((func, fix["operands"]))
+        else:
+            pre_processors.append(func)
+
+    return tuple(pre_processors), tuple(post_processors)
+
+
 class Fixer(Lookup):
-    """Fixer class to look up fixes to apply to input dataset from the elastic search index.
+    """Fixer class to look up fixes to apply to input dataset from the fix store.
 
     Gathers fixes into pre- and post-processors.
     Pre-process fixes are chained together to allow them to be executed with one call.
@@ -33,30 +174,70 @@ class Fixer(Lookup):
         Lookup.__init__(self, dset)
         self._lookup_fix()
 
-    def _gather_fixes(self, content):
-        """Gather pre- and post-processing fixes together."""
-        if content["_source"]["fixes"]:
-            for fix in content["_source"]["fixes"]:
-                ref_implementation = fix["reference_implementation"]
-                func = locate(ref_implementation)
+    @classmethod
+    def _from_content(cls, dset, content):
+        """Create a Fixer from a fix document that has already been retrieved."""
+        fix = cls.__new__(cls)
+        Lookup.__init__(fix, dset)
+        fix._reset()
 
-                if fix["process_type"] == "post_processor":
-                    self.post_processors.append([func, fix["operands"]])
-                else:
-                    self.pre_processors.append(func)
+        if content:
+            fix._gather_fixes(content)
 
+        return fix
+
+    @classmethod
+    def for_collection(cls, dsets):
+        """Look up the fixes for every dataset in a collection with a single request.
+
+        :param dsets: Sequence of dataset identifiers.
+        :return: An ordered dictionary of each dataset and its Fixer.
+        """
+        ids = collections.OrderedDict(
+            (dset, Lookup(dset)._convert_id(dset)) for dset in dsets
+        )
+
+        cache = get_fix_cache()
+        docs = {id: cache.get(id) for id in ids.values()}
+        missing = [id for id, content in docs.items() if content is MISSING]
+
+        if missing:
+            for id, content in get_fix_store().mget(missing).items():
+                cache.set(id, content)
+                docs[id] = content
+
+        return collections.OrderedDict(
+            (dset, cls._from_content(dset, docs[id])) for dset, id in ids.items()
+        )
+
+    def _reset(self):
+        self.pre_processor = None
+        self.pre_processors = []
+        self.post_processors = []
+
+    def _gather_fixes(self, content):
+        """Gather pre- and post-processing fixes together."""
+        fixes = content["_source"]["fixes"]
+        if fixes:
+            pre_processors, post_processors = compile_fixes(
+                json.dumps(fixes, sort_keys=True)
+            )
+            self.pre_processors = list(pre_processors)
+            self.post_processors = [list(post) for post in post_processors]
             self.pre_processor = FuncChainer(self.pre_processors)
 
     def _lookup_fix(self):
         """Look up fixes on the elasticsearch index."""
         id = self._convert_id(self.dset)
 
-        self.pre_processor = None
-        self.pre_processors = []
-        self.post_processors = []
+        self._reset()
+
+        cache = get_fix_cache()
+        content = cache.get(id)
+
+        if content is MISSING:
+            content = get_fix_store().get(id)
+            cache.set(id, content)
 
-        try:
-            content = self.es.get(index=config_()["elasticsearch"]["fix_store"], id=id)
+        if content:
             self._gather_fixes(content)
-        except exceptions.NotFoundError:
-            pass
@@ -0,0 +1,91 @@
+"""Metrics of the time and resources taken to run an operation.
+
+The metrics of an operation are held in a dictionary, recorded in the `metadata` of
+its `daops.utils.normalise.ResultSet` under "metrics"::
+
+    {
+        "consolidate": 0.12,  # seconds taken to find the files of the collection
+        "fix_lookup": 0.05,  # seconds taken to look up the fixes of the collection
+        # peak resident memory in bytes of the process that ran the request, since it
+        # started (datasets processed in other processes are not included)
+        "process_peak_rss": 268435456,
+        "datasets": {
+            ds_id: {
+                "input_files": 2,
+                "input_bytes": 1048576,
+                "open": 0.3,  # seconds taken to open and fix the dataset
+                "process": 1.4,  # seconds taken to compute and write the outputs
+                "output_files": 1,
+                "output_bytes": 524288,  # None unless [output] record_size is set
+            },
+        },
+    }
+
+Stages that were not run, or could not be measured, are left out or set to None.
+"""
+
+import contextlib
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+@contextlib.contextmanager
+def timer(metrics, key):
+    """Add the seconds taken to run the body of the `with` statement to `metrics[key]`.
+
+    Nothing is recorded if `metrics` is None.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics[key] = metrics.get(key, 0) + time.perf_counter() - start
+
+
+def new_metrics():
+    """Return an empty dictionary of the metrics of an operation."""
+    return {"datasets": {}}
+
+
+def dataset_metrics(metrics, dset):
+    """Return the dictionary of the metrics of `dset`, or None if `metrics` is None."""
+    if metrics is None:
+        return None
+    return metrics["datasets"].setdefault(dset, {})
+
+
+def peak_rss():
+    """Return the peak resident set size of the current process in bytes, or None if unknown.
+
+    This is the high-water mark since the process started, not that of any one request.
+    """
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS and kilobytes elsewhere
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def input_metrics(file_paths):
+    """Return the number and total size in bytes of the input files of a dataset.
+
+    Files that are not on the local file system (e.g. URLs) are not counted in the size.
+    """
+    file_paths = [file_paths] if isinstance(file_paths, str) else list(file_paths)
+    size = 0
+
+    for fpath in file_paths:
+        try:
+            size += os.stat(fpath).st_size
+        except (OSError, TypeError, ValueError):
+            pass
+
+    return {"input_files": len(file_paths), "input_bytes": size}
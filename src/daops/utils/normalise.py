@@ -1,48 +1,174 @@
 """Normalise datasets."""
 
 import collections
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+from clisops.utils.dataset_utils import is_kerchunk_file
 from loguru import logger
 
+from daops import __version__, config_
 from daops.utils.core import open_dataset
+from daops.utils.fixer import Fixer
+from daops.utils.metrics import dataset_metrics, input_metrics, new_metrics, timer
+from daops.utils.outputs import OutputFile, OutputURL
 
 
-def normalise(collection, apply_fixes=True):
-    """Take file paths, then open and fix the datasets they make up.
+def lookup_fixes(collection, apply_fixes=True):
+    """Look up the fixes for every dataset in the collection with a single request.
+
+    :param collection: Ordered dictionary of ds ids and their related file paths.
+    :param apply_fixes: Boolean. If False no fixes are looked up.
+    :return: Dictionary of ds ids and their `Fixer`.
+    """
+    if not apply_fixes:
+        return {}
+
+    return Fixer.for_collection(
+        [dset for dset in collection if not is_kerchunk_file(dset)]
+    )
+
+
+def _open_dataset(dset, file_paths, apply_fixes, fix, metrics):
+    ds_metrics = dataset_metrics(metrics, dset)
+    if ds_metrics is not None:
+        ds_metrics.update(input_metrics(file_paths))
+
+    with timer(ds_metrics, "open"):
+        return open_dataset(dset, file_paths, apply_fixes, fix)
+
+
+def _result(dset, get, capture_errors):
+    try:
+        return get()
+    except Exception as err:
+        if not capture_errors:
+            raise
+        logger.error(f"Failed to open and fix {dset}: {err}")
+        return err
+
+
+def iter_normalise(
+    collection, apply_fixes=True, prefetch=None, metrics=None, capture_errors=False
+):
+    """Take file paths, then lazily open and fix the datasets they make up, one at a time.
+
+    Only the dataset being consumed, plus up to `prefetch` datasets opened ahead of it
+    in a background thread, are held at any time.
 
     :param collection: Ordered dictionary of ds ids and their related file paths.
     :param apply_fixes: Boolean. If True fixes will be applied to datasets if needed. Default is True.
-    :return: An ordered dictionary of ds ids and their fixed xarray Dataset.
+    :param prefetch: Number of datasets to open ahead of the consumer.
+                     Defaults to `prefetch` in the `[processor]` section of the config.
+    :param metrics: Optional dictionary of metrics (see `daops.utils.metrics`) in which
+                    the time taken to look up fixes, and the inputs of each dataset and
+                    the time taken to open it, are recorded.
+    :param capture_errors: If True the exception raised while opening or fixing a dataset
+                           is yielded in place of the Dataset, rather than raised.
+    :return: Generator of ds ids and their fixed xarray Dataset.
     """
     logger.info(f"Working on datasets: {collection}")
-    norm_collection = collections.OrderedDict()
 
-    for dset, file_paths in collection.items():
-        ds = open_dataset(dset, file_paths, apply_fixes)
-        norm_collection[dset] = ds
+    if prefetch is None:
+        prefetch = config_().get("processor", {}).get("prefetch", 0)
+
+    with timer(metrics, "fix_lookup"):
+        fixes = lookup_fixes(collection, apply_fixes)
 
-    return norm_collection
+    if not prefetch:
+        for dset, file_paths in collection.items():
+            yield dset, _result(
+                dset,
+                functools.partial(
+                    _open_dataset,
+                    dset,
+                    file_paths,
+                    apply_fixes,
+                    fixes.get(dset),
+                    metrics,
+                ),
+                capture_errors,
+            )
+        return
+
+    items = iter(collection.items())
+    pending = collections.deque()
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="daops-open") as pool:
+        try:
+            for dset, file_paths in items:
+                future = pool.submit(
+                    _open_dataset,
+                    dset,
+                    file_paths,
+                    apply_fixes,
+                    fixes.get(dset),
+                    metrics,
+                )
+                pending.append((dset, future))
+                if len(pending) > prefetch:
+                    dset, future = pending.popleft()
+                    yield dset, _result(dset, future.result, capture_errors)
+
+            while pending:
+                dset, future = pending.popleft()
+                yield dset, _result(dset, future.result, capture_errors)
+
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def normalise(collection, apply_fixes=True):
+    """Take file paths, then open and fix the datasets they make up.
+
+    :param collection: Ordered dictionary of ds ids and their related file paths.
+    :param apply_fixes: Boolean. If True fixes will be applied to datasets if needed. Default is True.
+    :return: An ordered dictionary of ds ids and their fixed xarray Dataset.
+    """
+    return collections.OrderedDict(iter_normalise(collection, apply_fixes, prefetch=0))
 
 
 class ResultSet:
     """A class to hold the results from an operation e.g. subset."""
 
-    def __init__(self, inputs=None):  # noqa: D107
+    def __init__(self, inputs=None, metrics=None):  # noqa: D107
         self._results = collections.OrderedDict()
-        self.metadata = {"inputs": inputs, "process": "something", "version": 0.1}
+        self.metrics = metrics if metrics is not None else new_metrics()
+        self.metadata = {
+            "inputs": inputs,
+            "process": "daops",
+            "version": __version__,
+            "metrics": self.metrics,
+        }
         self.file_uris = []
+        self.errors = collections.OrderedDict()
 
     def add(self, dset, result):
         """Add outputs to an ordered dictionary with the ds id as the key.
 
-        If the output is a file path this is also added to the file_paths variable
-        so a list of file paths can be accessed independently.
+        Any metrics recorded with the outputs are added to the metrics of the dataset.
+        If the output is a file path or URL this is also added to the file_uris variable
+        so a list of them can be accessed independently. Outputs tagged by
+        `daops.utils.outputs.tag_outputs` are told apart without accessing the file system.
         """
         self._results[dset] = result
 
+        # metrics measured by the worker that processed the dataset
+        metrics = getattr(result, "metrics", None)
+        if metrics:
+            dataset_metrics(self.metrics, dset).update(metrics)
+
         for item in result:
-            if isinstance(item, str) and (
+            if isinstance(item, (OutputFile, OutputURL)):
+                self.file_uris.append(item)
+            # untagged outputs, e.g. from operations run outside of daops
+            elif isinstance(item, str) and (
                 os.path.isfile(item) or item.startswith("https")
             ):
                 self.file_uris.append(item)
+
+    def add_error(self, dset, error):
+        """Record the exception raised while processing a dataset."""
+        self.errors[dset] = error
@@ -0,0 +1,169 @@
+"""Outputs of operations, tagged with their type where they are produced.
+
+An operation returns a list of outputs that are either paths of the files it wrote,
+URLs, or in-memory xarray Datasets. Paths and URLs are returned as `OutputFile` and
+`OutputURL` strings, so that a `daops.utils.normalise.ResultSet` can tell them apart
+without touching the file system. The list is returned as `Outputs`, which also
+holds the metrics of the dataset that were measured where it was processed.
+"""
+
+import hashlib
+import os
+import stat
+
+from clisops.utils.output_utils import SUPPORTED_FORMATS
+
+from daops import config_
+from daops.utils.metrics import timer
+
+
+class OutputFile(str):
+    """Path of an output file written by an operation.
+
+    :ivar size: Size of the file in bytes, recorded when it was written, or None.
+    :ivar checksum: "<algorithm>:<hex digest>" of the file, or None if not recorded.
+    """
+
+    def __new__(cls, path, size=None, checksum=None):  # noqa: D102
+        obj = super().__new__(cls, path)
+        obj.size = size
+        obj.checksum = checksum
+        return obj
+
+    def __reduce__(self):  # noqa: D105
+        return self.__class__, (str(self), self.size, self.checksum)
+
+
+class OutputURL(str):
+    """URL of an output of an operation."""
+
+
+class Outputs(list):
+    """List of the outputs of an operation on a dataset.
+
+    :ivar metrics: Dictionary of the metrics of the dataset (see `daops.utils.metrics`).
+    """
+
+    def __init__(self, outputs=(), metrics=None):  # noqa: D107
+        super().__init__(outputs)
+        self.metrics = metrics if metrics is not None else {}
+
+
+def is_url(item):
+    """Return True if the string `item` is an http(s) URL."""
+    return item.startswith(("https://", "http://"))
+
+
+def _stat(fpath):
+    try:
+        return os.stat(fpath)
+    except OSError:
+        return None
+
+
+def _is_file(st):
+    return st is not None and stat.S_ISREG(st.st_mode)
+
+
+def get_checksum(fpath, algorithm):
+    """Return the "<algorithm>:<hex digest>" checksum of the file at `fpath`."""
+    digest = hashlib.new(algorithm)
+
+    with open(fpath, "rb") as reader:
+        for block in iter(lambda: reader.read(1 << 20), b""):
+            digest.update(block)
+
+    return f"{algorithm}:{digest.hexdigest()}"
+
+
+def tag_outputs(outputs, output_type, record_size=None, checksum=None):
+    """Tag the outputs of an operation with their type.
+
+    The paths returned for output types with a writer are those of the files the
+    operation has just written, so they are tagged without accessing the file system.
+    Recording the size or checksum of each output file needs a `stat` (and a read),
+    so must be enabled, and must be done where the outputs were written.
+
+    :param outputs: List of outputs returned by the operation.
+    :param output_type: The output type passed to the operation, e.g. "netcdf" or "xarray".
+    :param record_size: If True the size of each output file is recorded. Defaults to
+                        `record_size` in the `[output]` section of the config.
+    :param checksum: Name of the `hashlib` algorithm used to record the checksum of
+                     each output file. Defaults to `checksum` in the `[output]` section of
+                     the config, and no checksum is recorded if that is empty.
+    :return: List of outputs, where paths are `OutputFile` and URLs `OutputURL` strings.
+    """
+    output_config = config_().get("output", {})
+    if record_size is None:
+        record_size = output_config.get("record_size", False)
+    if checksum is None:
+        checksum = output_config.get("checksum")
+
+    # only outputs of types with a writer are files
+    writes_files = bool(SUPPORTED_FORMATS.get(output_type, {}).get("method"))
+    tagged = []
+
+    for item in outputs:
+        if isinstance(item, os.PathLike):
+            item = os.fspath(item)
+
+        if not isinstance(item, str) or isinstance(item, (OutputFile, OutputURL)):
+            tagged.append(item)
+        elif is_url(item):
+            tagged.append(OutputURL(item))
+        elif not writes_files:
+            tagged.append(item)
+        elif not (record_size or checksum):
+            tagged.append(OutputFile(item))
+        elif _is_file(st := _stat(item)):
+            tagged.append(
+                OutputFile(
+                    item,
+                    size=st.st_size,
+                    checksum=get_checksum(item, checksum) if checksum else None,
+                )
+            )
+        else:
+            # e.g. a zarr store, which is a directory
+            tagged.append(OutputFile(item))
+
+    return tagged
+
+
+def output_metrics(outputs):
+    """Return the number and total size in bytes of the output files of a dataset.
+
+    The size is None unless the size of every output file was recorded by
+    `tag_outputs` (see `record_size` in the `[output]` section
+    of the config).
+    """
+    files = [item for item in outputs if isinstance(item, OutputFile)]
+    sizes = [item.size for item in files]
+
+    return {
+        "output_files": len(files),
+        "output_bytes": None if None in sizes else sum(sizes),
+    }
+
+
+class TaggedOperation:
+    """Wrap an operation callable so that its outputs are tagged where they are produced.
+
+    The outputs are returned as `Outputs`, with the time taken to compute and write
+    them, their number and their size (if recorded) as metrics.
+    """
+
+    def __init__(self, operation):  # noqa: D107
+        self.operation = operation
+        self.__name__ = operation.__name__
+
+    def __call__(self, ds, **kwargs):  # noqa: D102
+        metrics = {}
+
+        with timer(metrics, "process"):
+            outputs = tag_outputs(
+                self.operation(ds, **kwargs), kwargs.get("output_type")
+            )
+
+        metrics.update(output_metrics(outputs))
+        return Outputs(outputs, metrics)
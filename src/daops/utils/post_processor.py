@@ -0,0 +1,163 @@
+"""Apply the post-processing fixes of a dataset in batches.
+
+Fixes that add coordinates or data variables each return a new Dataset when applied
+one at a time. Here the variables they add are collected and assigned to the
+Dataset together, and attribute and encoding edits of the collected variables are
+made before they are assigned. Any other fix is applied as it is, once the
+variables collected before it have been assigned. They are also assigned before
+the coordinates attribute of the main variable is removed, so that it is removed
+after the coordinates added to it, as when the fixes are applied in turn. Values
+derived with "derive: ..." strings are computed from the Dataset before the
+collected variables are assigned to it.
+"""
+
+import collections
+
+import numpy as np
+import xarray as xr
+from clisops.utils import dataset_utils as xu
+
+from daops.data_utils.attr_utils import (
+    add_global_attrs_if_needed,
+    edit_global_attrs,
+    edit_var_attrs,
+    remove_coord_attr,
+)
+from daops.data_utils.common_utils import handle_derive_str
+from daops.data_utils.coord_utils import add_coord, add_scalar_coord
+from daops.data_utils.var_utils import add_data_var
+
+
+class _Batch:
+    """Variables to be added to a Dataset, and edits to make to it, in one pass."""
+
+    def __init__(self, ds_id, ds):  # noqa: D107
+        self.ds_id = ds_id
+        self.ds = ds
+        self.coords = collections.OrderedDict()
+        self.data_vars = collections.OrderedDict()
+        self.main_var_coords = []
+
+    def _derive(self, value):
+        return handle_derive_str(value, self.ds_id, self.ds)
+
+    def _derive_items(self, mapping):
+        return {k: self._derive(v) for k, v in (mapping or {}).items()}
+
+    def _pending(self, var_id):
+        return self.coords.get(var_id, self.data_vars.get(var_id))
+
+    def add_scalar_coord(self, **operands):
+        self.add_coord(dim=None, **operands)
+
+    def add_coord(self, **operands):
+        var_id = operands.get("var_id")
+        dim = operands.get("dim")
+        value = self._derive(operands.get("value"))
+
+        self.coords.pop(var_id, None)
+        self.coords[var_id] = xr.Variable(
+            dim or (),
+            np.array(value, dtype=operands.get("dtype")),
+            attrs=self._derive_items(operands.get("attrs")),
+            encoding=self._derive_items(operands.get("encoding")),
+        )
+        self.main_var_coords.append(var_id)
+
+    def add_data_var(self, **operands):
+        var_id = operands.get("var_id")
+
+        self.data_vars.pop(var_id, None)
+        self.data_vars[var_id] = xr.Variable(
+            (),
+            np.array(operands.get("value"), dtype=operands.get("dtype")),
+            attrs=dict(operands.get("attrs") or {}),
+        )
+
+    def edit_var_attrs(self, **operands):
+        var_id = operands.get("var_id")
+        attrs = self._derive_items(operands.get("attrs"))
+
+        var = self._pending(var_id)
+        (var if var is not None else self.ds[var_id]).attrs.update(attrs)
+
+    def edit_global_attrs(self, **operands):
+        self.ds.attrs.update(self._derive_items(operands.get("attrs")))
+
+    def add_global_attrs_if_needed(self, **operands):
+        for k, v in operands.get("attrs").items():
+            v = self._derive(v)
+            if not self.ds.attrs.get(k, None):
+                self.ds.attrs[k] = v
+
+    def remove_coord_attr(self, **operands):
+        var_ids = self._derive(operands.get("var_ids"))
+
+        # the coordinates of the main variable are only updated when the batch is
+        # flushed, so flush it before they are removed, as they were added first
+        if self.main_var_coords and xu.get_main_variable(self.ds) in var_ids:
+            self.flush()
+
+        for var_id in var_ids:
+            var = self._pending(var_id)
+            if var is None:
+                var = self.ds[var_id]
+            var.encoding["coordinates"] = None
+
+    def flush(self):
+        """Assign the collected variables to the Dataset and return it."""
+        ds = self.ds
+
+        if self.coords:
+            ds = ds.assign_coords(self.coords)
+        if self.data_vars:
+            ds = ds.assign(self.data_vars)
+
+        if self.main_var_coords:
+            # update coordinates of main variable of dataset
+            main_var = xu.get_main_variable(ds)
+            main_var_coords = ds[main_var].encoding.get("coordinates", "")
+            for var_id in self.main_var_coords:
+                main_var_coords += f" {var_id}"
+            ds[main_var].encoding["coordinates"] = main_var_coords
+
+        self.ds = ds
+        self.coords.clear()
+        self.data_vars.clear()
+        self.main_var_coords.clear()
+        return ds
+
+
+# fix functions that can be applied as part of a batch, and the method of `_Batch` doing so
+BATCHED = {
+    add_scalar_coord: _Batch.add_scalar_coord,
+    add_coord: _Batch.add_coord,
+    add_data_var: _Batch.add_data_var,
+    edit_var_attrs: _Batch.edit_var_attrs,
+    edit_global_attrs: _Batch.edit_global_attrs,
+    add_global_attrs_if_needed: _Batch.add_global_attrs_if_needed,
+    remove_coord_attr: _Batch.remove_coord_attr,
+}
+
+
+def apply_post_processors(ds_id, ds, post_processors):
+    """Apply the post-processing fixes of a dataset, batching those that can be.
+
+    The result is the same as applying each fix in turn with ``func(ds_id, ds, **operands)``.
+
+    :param ds_id: Dataset identifier in the form of a drs id.
+    :param ds: The xarray Dataset to fix.
+    :param post_processors: List of (function, operands) pairs of the post-processing fixes.
+    :return: xarray Dataset with the fixes applied.
+    """
+    batch = _Batch(ds_id, ds)
+
+    for func, operands in post_processors:
+        method = BATCHED.get(func)
+
+        if method is not None:
+            method(batch, **operands)
+        else:
+            batch.ds = func(ds_id, batch.flush(), **operands)
+
+    return batch.flush()
@@ -0,0 +1,55 @@
+"""Objects that are created on first use and shared by the threads of a process."""
+
+import os
+import threading
+
+
+class ProcessLocal:
+    """Object created on first use in each process, e.g. a database connection.
+
+    Connections must not be shared with a forked worker process, so the object is
+    created again by `factory` the first time it is used in a new process.
+    Callers that share the object between threads must serialise their use of it.
+    """
+
+    def __init__(self, factory):  # noqa: D107
+        self.factory = factory
+        self._obj = None
+        self._pid = None
+
+    def get(self):
+        """Return the object for the current process, creating it if needed."""
+        if self._pid != os.getpid():
+            self._obj = self.factory()
+            self._pid = os.getpid()
+        return self._obj
+
+
+class SharedObjects:
+    """Objects shared by all threads, keyed on e.g. the config they were created from.
+
+    :param per_process: If True, objects are not shared with forked worker processes,
+                        which create their own on first use.
+    """
+
+    def __init__(self, per_process=False):  # noqa: D107
+        self.per_process = per_process
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """Return the object for `key`, creating it with `factory()` on first use."""
+        if self.per_process:
+            key = os.getpid(), key
+
+        with self._lock:
+            if key not in self._objects:
+                self._objects[key] = factory()
+            return self._objects[key]
+
+    def clear(self):
+        """Remove all objects and return them, e.g. so that they can be closed."""
+        with self._lock:
+            objects = list(self._objects.values())
+            self._objects.clear()
+        return objects
@@ -42,6 +42,32 @@ def tmp_netcdf_filename(tmp_path):
     return tmp_path.joinpath("testfile.nc")
 
 
+@pytest.fixture
+def file_mapper(tmp_path):
+    """Return a function that writes a small netCDF4 file of monthly data for 2000-2001.
+
+    The function takes the variable name used in the file name and returns a
+    `FileMapper` of the file, which can be used as a dataset in a collection.
+    """
+    import numpy as np
+    import pandas as pd
+    import xarray as xr
+    from clisops.utils.file_utils import FileMapper
+
+    def _file_mapper(name):
+        fpath = tmp_path.joinpath(f"{name}_Amon_gn_200001-200112.nc")
+        xr.Dataset(
+            {"tas": (("time", "lat"), np.zeros((24, 3), dtype="f4"))},
+            coords={
+                "time": pd.date_range("2000-01-01", periods=24, freq="MS"),
+                "lat": [0.0, 1.0, 2.0],
+            },
+        ).to_netcdf(fpath)
+        return FileMapper([fpath.as_posix()])
+
+    return _file_mapper
+
+
 @pytest.fixture(scope="session")
 def stratus():
     return _stratus(
@@ -1,5 +1,10 @@
-from daops.catalog import IntakeCatalog
+import os
 
+import pandas as pd
+import pytest
+from daops import config_
+from daops.catalog import IntakeCatalog
+from daops.catalog.intake import clear_cache
 
 C3S_CMIP6_DAY_COLLECTION = (
     "c3s-cmip6.CMIP.SNU.SAM0-UNICON.historical.r1i1p1f1.day.pr.gn.v20190323"
@@ -81,3 +86,140 @@ def test_intake_catalog_c3s_cmip6_multiple():
     assert len(files) == 1
     files = result.files()[C3S_CMIP6_FX_COLLECTION]
     assert len(files) == 1
+
+
+CATALOG_YAML = """
+sources:
+  c3s-cmip6:
+    driver: csv
+    args:
+      urlpath: "{{ CATALOG_DIR }}/c3s-cmip6.csv"
+"""
+
+
+def _write_csv(path, rows):
+    df = pd.DataFrame(rows, columns=["ds_id", "path", "start_time", "end_time"])
+    df.to_csv(path.joinpath("c3s-cmip6.csv"), index=False)
+
+
+def _local_catalog(path, rows):
+    clear_cache()
+    _write_csv(path, rows)
+    path.joinpath("c3s.yaml").write_text(CATALOG_YAML)
+    return IntakeCatalog(project="c3s-cmip6", url=path.joinpath("c3s.yaml").as_posix())
+
+
+def test_intake_catalog_query_local(tmp_path):
+    cat = _local_catalog(
+        tmp_path,
+        [
+            ["ds.a", "a/1.nc", "1900-01-01T12:00:00", "1900-12-30T12:00:00"],
+            ["ds.a", "a/2.nc", "1901-01-01T12:00:00", "1901-12-30T12:00:00"],
+            ["ds.b", "b/1.nc", None, None],
+            ["ds.c", "c/1.nc", "undefined", "undefined"],
+            ["ds.a", "a/3.nc", "1902-01-01T12:00:00", "1902-12-30T12:00:00"],
+        ],
+    )
+
+    assert cat._query(["ds.a", "ds.b"]) == {
+        "ds.a": ["a/1.nc", "a/2.nc", "a/3.nc"],
+        "ds.b": ["b/1.nc"],
+    }
+    assert cat._query(["ds.a", "ds.b", "ds.c"], time="1901-06-01/1902-01-01") == {
+        "ds.a": ["a/2.nc", "a/3.nc"],
+        "ds.b": ["b/1.nc"],
+        "ds.c": ["c/1.nc"],
+    }
+    assert cat._query(["ds.a"], time="1899-01-01/1899-12-31") == {}
+
+
+def test_intake_catalog_query_unsorted_local(tmp_path):
+    cat = _local_catalog(
+        tmp_path,
+        [
+            ["ds.a", "a/3.nc", "1902-01-01T12:00:00", "1902-12-30T12:00:00"],
+            ["ds.b", "b/2.nc", "1900-07-01T12:00:00", "1900-12-30T12:00:00"],
+            ["ds.a", "a/1.nc", "1900-01-01T12:00:00", "1900-12-30T12:00:00"],
+            ["ds.b", "b/1.nc", "1900-01-01T12:00:00", "1905-12-30T12:00:00"],
+            ["ds.a", "a/2.nc", "1901-01-01T12:00:00", "1901-12-30T12:00:00"],
+        ],
+    )
+
+    assert cat._query(["ds.b", "ds.a"], time="1901-06-01/1901-07-01") == {
+        "ds.b": ["b/1.nc"],
+        "ds.a": ["a/2.nc"],
+    }
+    assert cat._query(["ds.a"], time="1900-06-01/1901-07-01") == {
+        "ds.a": ["a/1.nc", "a/2.nc"]
+    }
+    assert cat._query(["ds.x"]) == {}
+
+
+def test_intake_catalog_query_time_components_local(tmp_path):
+    cat = _local_catalog(
+        tmp_path,
+        [
+            ["ds.a", f"a/{year}.nc", f"{year}-01-16T12:00:00", f"{year}-12-16T12:00:00"]
+            for year in range(1900, 1910)
+        ]
+        + [["ds.b", "b/1.nc", None, None]],
+    )
+
+    assert cat._query(["ds.a", "ds.b"], time_components="year:1902,1905") == {
+        "ds.a": ["a/1902.nc", "a/1905.nc"],
+        "ds.b": ["b/1.nc"],
+    }
+    assert cat._query(
+        ["ds.a"], time="1904-01-01/1909-12-31", time_components="year:1902,1905"
+    ) == {"ds.a": ["a/1905.nc"]}
+    assert cat._query(["ds.a"], time_components="year:1950") == {}
+
+
+LOCAL_ROWS = [["ds.a", "a/1.nc", "1900-01-01T12:00:00", "1900-12-30T12:00:00"]]
+
+
+def test_intake_catalog_shared_between_instances(tmp_path, monkeypatch):
+    cat = _local_catalog(tmp_path, LOCAL_ROWS)
+    index = cat._load_index()
+
+    other = IntakeCatalog(project="c3s-cmip6", url=cat.url)
+    assert other._load_index() is index
+
+    # catalog is revalidated, but not re-read if unchanged
+    monkeypatch.setitem(config_()["catalog"], "revalidate_interval", -1)
+    assert other._load_index() is index
+
+    # re-read once the catalog file has changed
+    _write_csv(tmp_path, LOCAL_ROWS + [["ds.b", "b/1.nc", None, None]])
+    csv_path = tmp_path.joinpath("c3s-cmip6.csv")
+    os.utime(csv_path, (1, 1))
+    assert other._load_index() is not index
+    assert other._query(["ds.b"]) == {"ds.b": ["b/1.nc"]}
+
+
+def test_intake_catalog_parquet_copy(tmp_path, monkeypatch):
+    monkeypatch.setitem(config_()["catalog"], "cache_dir", tmp_path.as_posix())
+    cat = _local_catalog(tmp_path, LOCAL_ROWS)
+    assert cat._query(["ds.a"]) == {"ds.a": ["a/1.nc"]}
+    assert os.path.isfile(cat._parquet_path())
+
+    # cold start reads the Parquet copy rather than the CSV
+    clear_cache()
+    monkeypatch.setattr(
+        IntakeCatalog, "_prepare", lambda df: pytest.fail("CSV should not be read")
+    )
+    assert cat._query(["ds.a"]) == {"ds.a": ["a/1.nc"]}
+
+
+def test_intake_catalog_without_pyarrow(tmp_path, monkeypatch):
+    import daops.catalog.intake
+
+    monkeypatch.setattr(daops.catalog.intake, "pyarrow", None)
+    monkeypatch.setitem(config_()["catalog"], "cache_dir", tmp_path.as_posix())
+    clear_cache()
+
+    # the catalog is read from the CSV without writing a local copy
+    cat = _local_catalog(tmp_path, LOCAL_ROWS)
+    assert cat._parquet_path() is None
+    assert cat._query(["ds.a"]) == {"ds.a": ["a/1.nc"]}
+    assert not list(tmp_path.glob("*.parquet"))
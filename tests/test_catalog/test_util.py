@@ -1,4 +1,9 @@
-from daops.catalog.util import parse_time
+import pytest
+from daops.catalog.util import (
+    parse_time,
+    parse_time_components,
+    span_matches_components,
+)
 
 
 def test_parse_time():
@@ -17,3 +22,26 @@ def test_parse_time():
         "2001-01-01T00:00:00",
         "2010-12-31T23:59:59",
     )
+
+
+@pytest.mark.parametrize(
+    "start,end,time_components,expected",
+    [
+        # 1850-01 to 2014-12
+        (18500100000000, 20141299999999, "year:1970,1980", True),
+        (18500100000000, 20141299999999, "year:1700,2020", False),
+        (18500100000000, 20141299999999, "month:dec,jan,feb", True),
+        # 1970-03 to 1970-11
+        (19700301000000, 19701130000000, "month:dec,jan,feb", False),
+        (19700301000000, 19701130000000, "year:1970|month:jun", True),
+        (19700301000000, 19701130000000, "year:1971|month:jun", False),
+        # 1970-11 to 1971-03
+        (19701101000000, 19710331000000, "month:dec,jan,feb", True),
+        (19701101000000, 19710331000000, "year:1971|month:jun,jul", False),
+        (19701101000000, 19710331000000, "day:01", True),
+        (19701101000000, 19710331000000, None, True),
+    ],
+)
+def test_span_matches_components(start, end, time_components, expected):
+    components = parse_time_components(time_components)
+    assert span_matches_components(start, end, components) is expected
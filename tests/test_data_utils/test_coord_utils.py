@@ -1,6 +1,9 @@
+import cftime
 import numpy as np
+import pytest
 import xarray as xr
 from daops.data_utils.coord_utils import add_coord, add_scalar_coord, squeeze_dims
+from daops.fix_utils.decadal_utils import get_lead_times
 from clisops.utils.dataset_utils import open_xr_dataset
 from xarray.coders import CFDatetimeCoder
 
@@ -135,3 +138,25 @@ def test_add_coord_with_derive(mini_esgf_data):
         ds_leadtime.leadtime.long_name == "Time elapsed since the start of the forecast"
     )
     assert ds_leadtime.leadtime.standard_name == "forecast_period"
+
+
+@pytest.mark.parametrize(
+    "calendar", ["standard", "noleap", "360_day", "all_leap", "proleptic_gregorian"]
+)
+def test_get_lead_times(calendar):
+    ds_id = "CMIP6.DCPP.MOHC.HadGEM3-GC31-MM.dcppA-hindcast.s2004-r3i1p1f2.day.pr.gn.v20200417"
+    times = xr.date_range(
+        "2004-10-20T12:00:00",
+        periods=400,
+        freq="D",
+        calendar=calendar,
+        use_cftime=True,
+    )
+    ds = xr.Dataset(coords={"time": times})
+
+    reftime = cftime.datetime(2004, 11, 1, calendar=calendar)
+    expected = [(time - reftime).days for time in ds.time.values]
+
+    lead_times = get_lead_times(ds_id, ds)
+    assert lead_times.dtype == np.int64
+    assert lead_times.tolist() == expected
@@ -8,7 +8,6 @@ from daops import config_
 from daops.ops.subset import subset
 from xarray.coders import CFDatetimeCoder
 
-
 TIME_CODER = CFDatetimeCoder(use_cftime=True)
 
 
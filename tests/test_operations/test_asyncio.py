@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+import xarray as xr
+from daops.ops.asyncio import async_calculate, async_subset
+from daops.ops.base import Operation
+from daops.ops.subset import subset
+
+
+def test_async_subset(file_mapper):
+    collection = [file_mapper("tas"), file_mapper("pr")]
+    kwargs = dict(time="2000-03-01/2000-06-30", output_type="xarray", apply_fixes=False)
+
+    result = asyncio.run(async_subset(collection, **kwargs))
+    expected = subset(collection, **kwargs)
+
+    assert list(result._results) == list(expected._results)
+    for dset, outputs in expected._results.items():
+        xr.testing.assert_identical(result._results[dset][0], outputs[0])
+        assert result._results[dset][0].sizes["time"] == 4
+
+    assert set(result.metadata["inputs"]) == {"collection", "params"}
+    metrics = result.metadata["metrics"]
+    assert "fix_lookup" in metrics
+    assert {"open", "process", "input_bytes"} <= set(metrics["datasets"][dset])
+
+
+def test_async_subset_error(file_mapper):
+    with pytest.raises(Exception):
+        asyncio.run(
+            async_subset(
+                file_mapper("tas"),
+                area="0,0,1,1,2",
+                output_type="xarray",
+                apply_fixes=False,
+            )
+        )
+
+
+def test_async_calculate_cancel(file_mapper):
+    started = []
+    release = threading.Event()
+
+    def _blocking_op(ds, **kwargs):
+        started.append(ds)
+        release.wait(5)
+        return [ds]
+
+    class BlockingOp(Operation):
+        def get_operation_callable(self):
+            return _blocking_op
+
+    collection = [file_mapper(f"v{i}") for i in range(3)]
+    op = BlockingOp(collection, output_type="xarray", apply_fixes=False)
+
+    async def _run():
+        task = asyncio.ensure_future(async_calculate(op, max_workers=1))
+        while not started:
+            await asyncio.sleep(0.01)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_run())
+    release.set()
+
+    # the datasets waiting behind the first one are never processed
+    assert len(started) == 1
@@ -0,0 +1,122 @@
+import os
+
+import pytest
+import xarray as xr
+from daops.ops.base import Operation
+
+
+class RecordingOp(Operation):
+    processed = []
+
+    def get_operation_callable(self):
+        def _record(ds, **kwargs):
+            if ds.attrs.get("fail"):
+                raise ValueError("failed")
+            self.processed.append(ds)
+            return [len(self.processed)]
+
+        return _record
+
+
+@pytest.fixture
+def collection(file_mapper):
+    RecordingOp.processed = []
+    return [file_mapper(f"v{i}") for i in range(3)]
+
+
+def test_iter_results_is_lazy(collection):
+    op = RecordingOp(collection, output_type="xarray", apply_fixes=False, mode="serial")
+    results = op.iter_results()
+
+    dset, outputs = next(results)
+    # the outputs of the first dataset are ready before the others are processed
+    assert outputs == [1]
+    assert len(RecordingOp.processed) == 1
+
+    assert [outputs for _, outputs in results] == [[2], [3]]
+    assert dset == list(op.collection)[0]
+
+
+def test_calculate_on_result(collection):
+    op = RecordingOp(collection, output_type="xarray", apply_fixes=False, mode="serial")
+    seen = []
+
+    def on_result(dset, outputs):
+        seen.append((dset, outputs, len(RecordingOp.processed)))
+
+    rs = op.calculate(on_result=on_result)
+
+    assert [(dset, outputs) for dset, outputs, _ in seen] == list(rs._results.items())
+    # each dataset is reported as soon as it is done
+    assert [n for _, _, n in seen] == [1, 2, 3]
+    assert rs.metadata["inputs"] == {"collection": op.collection, "params": op.params}
+
+
+@pytest.mark.parametrize("mode", ["serial", "threads"])
+def test_calculate_metrics(collection, mode):
+    op = RecordingOp(collection, output_type="xarray", apply_fixes=False, mode=mode)
+    rs = op.calculate()
+    metrics = rs.metadata["metrics"]
+
+    assert metrics["consolidate"] > 0
+    assert metrics["fix_lookup"] >= 0
+    assert metrics["process_peak_rss"] > 0
+    assert list(metrics["datasets"]) == list(op.collection)
+
+    for dset, file_paths in op.collection.items():
+        ds_metrics = metrics["datasets"][dset]
+        assert ds_metrics["input_files"] == len(file_paths) == 1
+        assert ds_metrics["input_bytes"] == os.path.getsize(file_paths[0])
+        assert ds_metrics["open"] > 0
+        assert ds_metrics["process"] >= 0
+        assert ds_metrics["output_files"] == ds_metrics["output_bytes"] == 0
+        assert "peak_rss" not in ds_metrics
+
+
+@pytest.fixture
+def fail_second(monkeypatch):
+    import daops.ops.base
+
+    def _iter_normalise(collection, apply_fixes, **kwargs):
+        for dset in collection:
+            yield dset, xr.Dataset(attrs={"fail": dset == list(collection)[1]})
+
+    monkeypatch.setattr(daops.ops.base.normalise, "iter_normalise", _iter_normalise)
+
+
+def test_iter_results_error(collection, fail_second):
+    op = RecordingOp(collection, output_type="xarray", apply_fixes=False, mode="serial")
+    results = op.iter_results()
+
+    assert next(results)[1] == [1]
+    with pytest.raises(ValueError):
+        next(results)
+
+
+@pytest.mark.parametrize("mode", ["serial", "threads"])
+def test_calculate_errors(collection, fail_second, mode):
+    op = RecordingOp(collection, output_type="xarray", apply_fixes=False, mode=mode)
+
+    with pytest.raises(ValueError):
+        op.calculate()
+
+    rs = op.calculate(raise_errors=False)
+    dsets = list(op.collection)
+
+    assert list(rs._results) == [dsets[0], dsets[2]]
+    assert list(rs.errors) == [dsets[1]]
+    assert isinstance(rs.errors[dsets[1]], ValueError)
+
+
+@pytest.mark.parametrize("mode", ["serial", "threads"])
+def test_calculate_unreadable_dataset(collection, mode):
+    op = RecordingOp(collection, output_type="xarray", apply_fixes=False, mode=mode)
+    dsets = list(op.collection)
+
+    with open(op.collection[dsets[1]][0], "wb") as writer:
+        writer.write(b"not a netCDF file")
+
+    rs = op.calculate(raise_errors=False)
+
+    assert list(rs._results) == [dsets[0], dsets[2]]
+    assert list(rs.errors) == [dsets[1]]
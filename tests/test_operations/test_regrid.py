@@ -4,7 +4,6 @@ from packaging.version import Version
 import pytest
 import xarray as xr
 
-
 CMIP6_IDS = ["CMIP6.CMIP.MPI-M.MPI-ESM1-2-HR.historical.r1i1p1f1.Omon.tos.gn.v20190710"]
 
 
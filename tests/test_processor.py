@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+import pytest
+from daops.processor import dispatch, get_mode, process
+
+
+def double(value, factor=2):
+    return [value * factor]
+
+
+def fail_on_negative(value):
+    if value < 0:
+        raise ValueError(f"negative value: {value}")
+    return [value]
+
+
+COLLECTION = OrderedDict([(f"ds{i}", i) for i in range(10)])
+
+
+def test_process_serial():
+    assert process(double, 3, mode="serial", factor=3) == [9]
+
+
+@pytest.mark.parametrize("mode", ["threads", "processes"])
+def test_process_other_mode(mode):
+    assert process(double, 3, mode=mode, factor=3) == [9]
+
+
+@pytest.mark.parametrize("mode", ["threads", "processes"])
+def test_dispatch_keeps_collection_order(mode):
+    results, errors = dispatch(double, COLLECTION, mode=mode, max_workers=3)
+    assert list(results.keys()) == list(COLLECTION.keys())
+    assert list(results.values()) == [[i * 2] for i in range(10)]
+    assert errors == {}
+
+
+@pytest.mark.parametrize("mode", ["serial", "threads"])
+def test_dispatch_captures_errors(mode):
+    collection = OrderedDict([("a", 1), ("b", -1), ("c", 2)])
+    results, errors = dispatch(fail_on_negative, collection, mode=mode)
+    assert list(results.keys()) == ["a", "c"]
+    assert list(errors.keys()) == ["b"]
+    assert isinstance(errors["b"], ValueError)
+
+
+def test_process_error_is_raised():
+    with pytest.raises(ValueError):
+        process(fail_on_negative, -1, mode="threads")
+
+
+def test_dask_mode_needs_cluster_dispatch():
+    with pytest.raises(ValueError, match="imap_cluster"):
+        process(double, 3, mode="dask")
+
+    with pytest.raises(ValueError, match="imap_cluster"):
+        dispatch(double, COLLECTION, mode="dask")
+
+
+def test_get_mode_invalid():
+    with pytest.raises(ValueError):
+        get_mode("parallel")
+
+
+def count_times(ds, **kwargs):
+    return [ds.sizes["time"]]
+
+
+@pytest.fixture
+def local_client():
+    from dask.distributed import Client, LocalCluster
+
+    with LocalCluster(n_workers=2, threads_per_worker=1, processes=True) as cluster:
+        with Client(cluster) as client:
+            yield client
+
+
+def test_dispatch_to_cluster(tmp_path, local_client):
+    import numpy as np
+    import xarray as xr
+    from daops.processor import dispatch_to_cluster
+
+    collection = OrderedDict()
+    for i in range(1, 4):
+        fpath = tmp_path.joinpath(f"ds{i}.nc")
+        xr.Dataset(
+            {"tas": ("time", np.arange(i, dtype="f4"))},
+            coords={"time": np.arange(i)},
+        ).to_netcdf(fpath)
+        collection[f"ds{i}"] = [fpath.as_posix()]
+
+    collection["missing"] = [tmp_path.joinpath("missing.nc").as_posix()]
+
+    results, errors = dispatch_to_cluster(
+        count_times, collection, apply_fixes=False, client=local_client
+    )
+    assert list(results.items()) == [("ds1", [1]), ("ds2", [2]), ("ds3", [3])]
+    assert list(errors.keys()) == ["missing"]
+
+
+def test_imap_is_bounded():
+    from daops.processor import imap
+
+    pulled = []
+
+    def _collection():
+        for dset, value in COLLECTION.items():
+            pulled.append(dset)
+            yield dset, value
+
+    outputs = imap(double, _collection(), mode="threads", max_workers=2)
+    assert next(outputs) == ("ds0", [0], None)
+    assert len(pulled) == 3
+
+    assert [dset for dset, _, _ in outputs] == list(COLLECTION)[1:]
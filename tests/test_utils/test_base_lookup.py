@@ -1,4 +1,4 @@
-from daops.utils.base_lookup import Lookup
+from daops.utils.base_lookup import Lookup, get_es_client
 
 
 def test_convert_to_ds_id(stratus):
@@ -10,3 +10,9 @@ def test_convert_to_ds_id(stratus):
     assert (
         ds_id == "cmip5.output1.MOHC.HadGEM2-ES.rcp85.mon.atmos.Amon.r1i1p1.latest.tas"
     )
+
+
+def test_es_client_is_shared():
+    dset = "cmip5.output1.MOHC.HadGEM2-ES.rcp85.mon.atmos.Amon.r1i1p1.latest.tas"
+    assert Lookup(dset).es is Lookup(dset).es
+    assert Lookup(dset).es is get_es_client()
@@ -0,0 +1,279 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from clisops.parameter import time_series
+from clisops.parameter.collection_parameter import CollectionParameter
+from clisops.parameter.time_components_parameter import TimeComponentsParameter
+from clisops.parameter.time_parameter import TimeParameter
+from daops import config_
+from daops.catalog.base import Catalog
+from daops.utils import consolidate
+from daops.utils.file_index import MISSING, FileIndex
+from daops.utils.file_list_cache import FileListCache
+
+
+def _write_nc(fpath, start="2000-01-01", periods=24, freq="MS", **kwargs):
+    times = pd.date_range(start, periods=periods, freq=freq)
+    xr.Dataset(
+        {"tas": ("time", np.zeros(periods, dtype="f4"))}, coords={"time": times}
+    ).to_netcdf(fpath, **kwargs)
+    return fpath.as_posix()
+
+
+def _fail_open(*args, **kwargs):
+    pytest.fail("file should not be opened")
+
+
+def test_get_years_from_file_name():
+    assert consolidate.get_years_from_file("tas_Amon_gn_185001-185212.nc") == {
+        1850,
+        1851,
+        1852,
+    }
+
+
+@pytest.mark.parametrize(
+    "fpath,expected",
+    [
+        ("tas_Amon_gn_185001-201412.nc", (18500100000000, 20141299999999)),
+        ("tas_day_gn_18500101-18501231.nc", (18500101000000, 18501231999999)),
+        ("tas_3hr_gn_185001010300-185001020000.nc", (18500101030000, 18500102000099)),
+        ("orog_fx_gn.nc", None),
+    ],
+)
+def test_get_time_span_from_name(fpath, expected):
+    assert consolidate.get_time_span_from_name(fpath) == expected
+
+
+def test_get_years_from_file_uses_index(tmp_path, monkeypatch):
+    fpath = _write_nc(tmp_path.joinpath("tas_Amon_gn.nc"))
+    index = FileIndex(tmp_path.joinpath("index.sqlite").as_posix())
+
+    assert consolidate.get_years_from_file(fpath, index=index) == {2000, 2001}
+    assert index.get(fpath) == (20000101000000, 20011201000000)
+
+    monkeypatch.setattr(consolidate, "open_xr_dataset", _fail_open)
+    assert consolidate.get_years_from_file(fpath, index=index) == {2000, 2001}
+
+    # a new index on the same database does not open the file either
+    new_index = FileIndex(index.path)
+    assert consolidate.get_years_from_file(fpath, index=new_index) == {2000, 2001}
+
+
+def test_file_index_ignores_changed_files(tmp_path):
+    fpath = _write_nc(tmp_path.joinpath("tas_Amon_gn.nc"))
+    index = FileIndex(tmp_path.joinpath("index.sqlite").as_posix())
+    index.set(fpath, (20000101000000, 20011201000000))
+
+    _write_nc(tmp_path.joinpath("tas_Amon_gn.nc"), start="1990-01-01", periods=36)
+    assert index.get(fpath) is MISSING
+    assert consolidate.get_years_from_file(fpath, index=index) == {1990, 1991, 1992}
+
+
+def test_build_file_index(tmp_path, monkeypatch):
+    _write_nc(tmp_path.joinpath("tas_Amon_gn.nc"))
+    _write_nc(tmp_path.joinpath("tas_Amon_gn_200001-200112.nc"))
+    index_path = tmp_path.joinpath("index.sqlite").as_posix()
+
+    assert consolidate.build_file_index([tmp_path.as_posix()], index_path) == 1
+    assert len(FileIndex(index_path)) == 1
+
+    looked_up = []
+    monkeypatch.setattr(
+        FileIndex, "get", lambda self, fpath: looked_up.append(fpath) or (1, 2)
+    )
+    assert consolidate.build_file_index([tmp_path.as_posix()], index_path) == 0
+    # files with dates in their names are not looked up in the index
+    assert looked_up == [tmp_path.joinpath("tas_Amon_gn.nc").as_posix()]
+
+
+def test_get_time_span_from_header(tmp_path, monkeypatch):
+    times = xr.date_range(
+        "1850-01-01", periods=30, freq="YS", calendar="360_day", use_cftime=True
+    )
+    fpath = tmp_path.joinpath("tas_Amon_gn.nc")
+    xr.Dataset(
+        {"tas": ("time", np.zeros(30, dtype="f4"))}, coords={"time": times}
+    ).to_netcdf(fpath)
+
+    assert consolidate.get_time_span_from_header(fpath) == (
+        18500101000000,
+        18790101000000,
+    )
+
+    monkeypatch.setattr(consolidate, "open_xr_dataset", _fail_open)
+    assert consolidate.get_years_from_file(fpath.as_posix()) == set(range(1850, 1880))
+
+
+def test_get_time_span_from_header_no_time(tmp_path):
+    fpath = tmp_path.joinpath("orog_fx_gn.nc")
+    xr.Dataset({"orog": ("lat", np.zeros(3, dtype="f4"))}).to_netcdf(fpath)
+    assert consolidate.get_time_span_from_header(fpath) is None
+    assert consolidate.get_years_from_file(fpath.as_posix()) == set()
+
+
+def test_get_years_from_file_netcdf3_fallback(tmp_path):
+    fpath = _write_nc(
+        tmp_path.joinpath("tas_Amon_gn.nc"), engine="scipy", format="NETCDF3_64BIT"
+    )
+    with pytest.raises(OSError):
+        consolidate.get_time_span_from_header(fpath)
+    assert consolidate.get_years_from_file(fpath) == {2000, 2001}
+
+
+def test_probe_time_spans_keeps_order(monkeypatch):
+    def _get_time_span_from_file(fpath):
+        # finish in the reverse order to which the files were submitted
+        time.sleep(0.01 * (5 - int(fpath)))
+        return int(fpath), int(fpath)
+
+    monkeypatch.setattr(
+        consolidate, "get_time_span_from_file", _get_time_span_from_file
+    )
+    monkeypatch.setitem(config_()["consolidate"], "max_workers", 4)
+
+    file_paths = [str(i) for i in range(5)]
+    assert consolidate.probe_time_spans(file_paths) == [(i, i) for i in range(5)]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_get_files_matching_time_range(monkeypatch, max_workers):
+    monkeypatch.setitem(config_()["consolidate"], "max_workers", max_workers)
+    file_paths = [
+        f"tas_Amon_gn_{year}01-{year + 9}12.nc" for year in range(1850, 2010, 10)
+    ]
+
+    interval = TimeParameter("1875-01-01/1891-06-30")
+    assert consolidate.get_files_matching_time_range(interval, file_paths) == [
+        "tas_Amon_gn_187001-187912.nc",
+        "tas_Amon_gn_188001-188912.nc",
+        "tas_Amon_gn_189001-189912.nc",
+    ]
+
+    series = TimeParameter(time_series(["1855-01-16", "1999-12-16", "1855-02-16"]))
+    assert consolidate.get_files_matching_time_range(series, file_paths) == [
+        "tas_Amon_gn_185001-185912.nc",
+        "tas_Amon_gn_199001-199912.nc",
+    ]
+
+
+def test_get_files_matching_time_range_months(tmp_path):
+    fx_path = tmp_path.joinpath("orog_fx_gn.nc")
+    xr.Dataset({"orog": ("lat", np.zeros(3, dtype="f4"))}).to_netcdf(fx_path)
+
+    file_paths = [
+        f"tas_Amon_gn_1850{m:02d}-1850{m + 2:02d}.nc" for m in range(1, 13, 3)
+    ] + [fx_path.as_posix()]
+
+    series = TimeParameter(time_series(["1850-05-16", "1850-06-16", "1850-11-16"]))
+    assert consolidate.get_files_matching_time_range(series, file_paths) == [
+        "tas_Amon_gn_185004-185006.nc",
+        "tas_Amon_gn_185010-185012.nc",
+        fx_path.as_posix(),
+    ]
+
+    interval = TimeParameter("1850-03-31T12:00:00/1850-04-01")
+    assert consolidate.get_files_matching_time_range(interval, file_paths) == [
+        "tas_Amon_gn_185001-185003.nc",
+        "tas_Amon_gn_185004-185006.nc",
+        fx_path.as_posix(),
+    ]
+
+
+def test_get_files_matching_time_components():
+    file_paths = [
+        f"tas_Amon_gn_{year}01-{year + 9}12.nc" for year in range(1850, 2010, 10)
+    ]
+
+    time_components = TimeComponentsParameter("year:1875,1999")
+    assert consolidate.get_files_matching_time_range(
+        None, file_paths, time_components
+    ) == ["tas_Amon_gn_187001-187912.nc", "tas_Amon_gn_199001-199912.nc"]
+
+    interval = TimeParameter("1990-01-01/2009-12-31")
+    assert consolidate.get_files_matching_time_range(
+        interval, file_paths, time_components
+    ) == ["tas_Amon_gn_199001-199912.nc"]
+
+
+def test_consolidate_collapses_duplicates(monkeypatch):
+    looked_up = []
+
+    def _dset_to_filepaths(dset, force=False):
+        # finish in the reverse order to which the datasets were submitted
+        time.sleep(0.01 * (3 - int(dset[-1])))
+        looked_up.append(dset)
+        return [f"{dset}/tas_Amon_gn_185001-185912.nc"]
+
+    monkeypatch.setattr(consolidate, "dset_to_filepaths", _dset_to_filepaths)
+    monkeypatch.setattr(consolidate, "get_project_name", lambda dset: "cmip6")
+    monkeypatch.setattr(consolidate, "get_catalog", lambda project: None)
+    monkeypatch.setitem(config_()["consolidate"], "max_workers", 4)
+
+    collection = CollectionParameter(["ds1", "ds2", "ds1", "ds3"])
+    result = consolidate.consolidate(collection)
+
+    assert list(result.items()) == [
+        (dset, [f"{dset}/tas_Amon_gn_185001-185912.nc"])
+        for dset in ["ds1", "ds2", "ds3"]
+    ]
+    assert sorted(looked_up) == ["ds1", "ds2", "ds3"]
+
+
+class _FakeCatalog(Catalog):
+    def __init__(self, records):
+        super().__init__("cmip6")
+        self.records = records
+        self.queries = []
+
+    def _query(self, collection, time=None, time_components=None):
+        self.queries.append(collection)
+        return {ds_id: self.records[ds_id] for ds_id in collection}
+
+
+def test_consolidate_from_catalog(monkeypatch):
+    catalog = _FakeCatalog({"ds1": ["ds1/a.nc"], "ds2": ["ds2/a.nc", "ds2/b.nc"]})
+    monkeypatch.setattr(consolidate, "get_project_name", lambda dset: "cmip6")
+    monkeypatch.setattr(consolidate, "get_catalog", lambda project: catalog)
+    monkeypatch.setattr(consolidate, "derive_ds_id", lambda dset: dset)
+
+    result = consolidate.consolidate(CollectionParameter(["ds1", "ds2", "ds1"]))
+    base_dir = config_()["project:cmip6"]["base_dir"]
+    assert list(result.items()) == [
+        ("ds1", [f"{base_dir}/ds1/a.nc"]),
+        ("ds2", [f"{base_dir}/ds2/a.nc", f"{base_dir}/ds2/b.nc"]),
+    ]
+    assert catalog.queries == [["ds1", "ds2"]]
+
+
+def test_get_filepaths_is_cached(tmp_path, monkeypatch):
+    data_dir = tmp_path.joinpath("v20200101")
+    data_dir.mkdir()
+    first = _write_nc(data_dir.joinpath("tas_Amon_gn_185001-185912.nc"))
+    listed = []
+
+    def _dset_to_filepaths(dset, force=False):
+        listed.append(dset)
+        return sorted(p.as_posix() for p in data_dir.glob("*.nc"))
+
+    monkeypatch.setattr(consolidate, "dset_to_filepaths", _dset_to_filepaths)
+    monkeypatch.setattr(consolidate, "get_file_list_cache", lambda: cache)
+    cache = FileListCache(maxsize=1)
+
+    assert consolidate.get_filepaths("ds1") == [first]
+    assert consolidate.get_filepaths("ds1") == [first]
+    assert listed == ["ds1"]
+
+    # adding a file to the directory invalidates the entry
+    second = _write_nc(data_dir.joinpath("tas_Amon_gn_186001-186912.nc"))
+    assert consolidate.get_filepaths("ds1") == [first, second]
+    assert listed == ["ds1", "ds1"]
+
+    # least recently used entries are evicted
+    consolidate.get_filepaths("ds2")
+    consolidate.get_filepaths("ds1")
+    assert listed == ["ds1", "ds1", "ds2", "ds1"]
+    assert (cache.hits, cache.misses) == (1, 4)
@@ -46,3 +46,35 @@ def test_is_characterised():
     dset = "c3s-cmip5.output1.ICHEC.EC-EARTH.historical.day.atmos.day.r1i1p1.tas.latest"
     result = Characterised(dset).lookup_characterisation()
     assert result is False
+
+
+class FakeEs:
+    def __init__(self, found):
+        self.found = found
+        self.calls = []
+
+    def mget(self, index, ids, source=None):
+        self.calls.append(ids)
+        return {"docs": [{"_id": id, "found": id in self.found} for id in ids]}
+
+
+def test_is_characterised_single_request(monkeypatch):
+    from daops.utils import core
+    from daops.utils.base_lookup import Lookup
+
+    dsets = [
+        "cmip5.output1.CCCma.CanCM4.rcp45.mon.ocean.Omon.r1i1p1.latest.zostoga",
+        "cmip5.output1.MOHC.HadGEM2-ES.rcp85.mon.atmos.Amon.r1i1p1.latest.tas",
+    ]
+    es = FakeEs({Lookup(dsets[0])._convert_id(dsets[0])})
+    monkeypatch.setattr(core, "get_es_client", lambda: es)
+
+    assert core.is_characterised(dsets + dsets[:1]) == {
+        dsets[0]: True,
+        dsets[1]: False,
+    }
+    assert len(es.calls) == 1
+    assert len(es.calls[0]) == 2
+
+    assert core.is_characterised(dsets, require_all=True) is False
+    assert core.is_characterised(dsets[:1], require_all=True) == {dsets[0]: True}
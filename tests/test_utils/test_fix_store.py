@@ -0,0 +1,128 @@
+import json
+
+import pytest
+from daops import config_
+from daops.utils.base_lookup import Lookup
+from daops.utils import fix_store
+from daops.utils.fix_store import LocalFixStore, get_fix_store
+
+DS_ID = "cmip5.output1.INM.inmcm4.rcp45.mon.ocean.Omon.r1i1p1.latest.zostoga"
+
+FIX_SOURCE = {
+    "dataset_id": DS_ID,
+    "fixes": [
+        {
+            "fix_id": "SqueezeDimensionsFix",
+            "operands": {"dims": ["lev"]},
+            "reference_implementation": "daops.data_utils.coord_utils.squeeze_dims",
+            "process_type": "post_processor",
+        }
+    ],
+}
+
+
+@pytest.fixture
+def fix_id():
+    return Lookup(DS_ID)._convert_id(DS_ID)
+
+
+@pytest.mark.parametrize("dump_format", ["json_lines", "list", "document"])
+def test_local_fix_store(tmp_path, fix_id, dump_format):
+    docs = [{"_id": fix_id, "_source": FIX_SOURCE}]
+    dump_path = tmp_path.joinpath("roocs-fix.json")
+    if dump_format == "json_lines":
+        dump_path.write_text("\n".join(json.dumps(doc) for doc in docs))
+    elif dump_format == "list":
+        dump_path.write_text(json.dumps(docs))
+    else:
+        dump_path.write_text(json.dumps(docs[0], indent=4))
+
+    store = LocalFixStore.build(dump_path, tmp_path.joinpath("fixes.sqlite"))
+
+    assert store.get(fix_id) == {"_source": FIX_SOURCE}
+    assert store.get("not-a-fix-id") is None
+    assert store.mget([fix_id, "not-a-fix-id"]) == {
+        fix_id: {"_source": FIX_SOURCE},
+        "not-a-fix-id": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "content", ['{"_id": "a", "_source":', '[{"_id": "a"}]', '{"fixes": []}']
+)
+def test_local_fix_store_invalid_dump(tmp_path, content):
+    dump_path = tmp_path.joinpath("roocs-fix.json")
+    dump_path.write_text(content)
+
+    with pytest.raises(ValueError, match="JSON lines"):
+        LocalFixStore.build(dump_path, tmp_path.joinpath("fixes.sqlite"))
+
+
+def test_build_snapshot_cli(tmp_path, fix_id, monkeypatch, capsys):
+    from daops import cli
+
+    dump_path = tmp_path.joinpath("roocs-fix.json")
+    dump_path.write_text(json.dumps([{"_id": fix_id, "_source": FIX_SOURCE}]))
+    snapshot_path = tmp_path.joinpath("fixes.sqlite").as_posix()
+
+    monkeypatch.setattr(
+        "sys.argv",
+        ["daops", "build-fix-snapshot", "-s", snapshot_path, dump_path.as_posix()],
+    )
+    cli.main()
+
+    assert "of 1 datasets" in capsys.readouterr().out
+    assert LocalFixStore(snapshot_path).get(fix_id) == {"_source": FIX_SOURCE}
+
+
+def test_local_fix_store_derives_id(tmp_path, fix_id):
+    dump_path = tmp_path.joinpath("roocs-fix.json")
+    dump_path.write_text(json.dumps([{"_source": FIX_SOURCE}]))
+
+    store = LocalFixStore.build([dump_path], tmp_path.joinpath("fixes.sqlite"))
+    assert store.get(fix_id) == {"_source": FIX_SOURCE}
+
+
+def test_get_fix_store_local(tmp_path, fix_id, monkeypatch):
+    dump_path = tmp_path.joinpath("roocs-fix.json")
+    dump_path.write_text(json.dumps([{"_id": fix_id, "_source": FIX_SOURCE}]))
+    snapshot_path = tmp_path.joinpath("fixes.sqlite").as_posix()
+    LocalFixStore.build(dump_path, snapshot_path)
+
+    monkeypatch.setitem(config_()["fixer"], "fix_store", "local")
+    monkeypatch.setitem(config_()["fixer"], "snapshot_path", snapshot_path)
+
+    store = get_fix_store()
+    assert isinstance(store, LocalFixStore)
+    assert store.get(fix_id) == {"_source": FIX_SOURCE}
+
+
+class FakeEsClient:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def mget(self, index, ids):
+        return {"docs": [self.docs[id] for id in ids]}
+
+
+def test_elasticsearch_fix_store_mget(fix_id, monkeypatch):
+    client = FakeEsClient(
+        {
+            fix_id: {"_id": fix_id, "found": True, "_source": FIX_SOURCE},
+            "not-a-fix-id": {"_id": "not-a-fix-id", "found": False},
+            "failed-id": {
+                "_id": "failed-id",
+                "error": {"type": "shard_not_available_exception"},
+            },
+        }
+    )
+    monkeypatch.setattr(fix_store, "get_es_client", lambda: client)
+    store = fix_store.ElasticsearchFixStore("roocs-fix")
+
+    assert store.mget([fix_id, "not-a-fix-id"]) == {
+        fix_id: {"_source": FIX_SOURCE},
+        "not-a-fix-id": None,
+    }
+
+    with pytest.raises(Exception, match="failed-id"):
+        store.mget([fix_id, "failed-id"])
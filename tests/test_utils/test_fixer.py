@@ -0,0 +1,154 @@
+import pytest
+from daops.data_utils.coord_utils import squeeze_dims
+from daops.utils import fix_store, fixer
+from daops.utils.base_lookup import Lookup
+
+CMIP5_IDS = [
+    "cmip5.output1.INM.inmcm4.rcp45.mon.ocean.Omon.r1i1p1.latest.zostoga",
+    "cmip5.output1.MOHC.HadGEM2-ES.rcp85.mon.atmos.Amon.r1i1p1.latest.tas",
+]
+
+FIX_DOC = {
+    "fixes": [
+        {
+            "fix_id": "SqueezeDimensionsFix",
+            "operands": {"dims": ["lev"]},
+            "reference_implementation": "daops.data_utils.coord_utils.squeeze_dims",
+            "process_type": "post_processor",
+        }
+    ]
+}
+
+
+class FakeFixStore(fix_store.FixStore):
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def mget(self, ids):
+        self.calls.append(ids)
+        return {
+            id: {"_source": self.docs[id]} if id in self.docs else None for id in ids
+        }
+
+
+@pytest.fixture(autouse=True)
+def clear_fix_cache():
+    fixer.get_fix_cache().clear()
+
+
+def test_fixer_for_collection(monkeypatch):
+    fix_id = Lookup(CMIP5_IDS[0])._convert_id(CMIP5_IDS[0])
+    store = FakeFixStore({fix_id: FIX_DOC})
+    monkeypatch.setattr(fixer, "get_fix_store", lambda: store)
+
+    fixes = fixer.Fixer.for_collection(CMIP5_IDS + CMIP5_IDS[:1])
+
+    assert len(store.calls) == 1
+    assert len(store.calls[0]) == 2
+    assert list(fixes) == CMIP5_IDS
+
+    assert fixes[CMIP5_IDS[0]].post_processors == [[squeeze_dims, {"dims": ["lev"]}]]
+    assert fixes[CMIP5_IDS[0]].pre_processors == []
+    assert fixes[CMIP5_IDS[1]].post_processors == []
+    assert fixes[CMIP5_IDS[1]].pre_processor is None
+
+
+def test_fixer_lookup_fix(monkeypatch):
+    fix_id = Lookup(CMIP5_IDS[0])._convert_id(CMIP5_IDS[0])
+    store = FakeFixStore({fix_id: FIX_DOC})
+    monkeypatch.setattr(fixer, "get_fix_store", lambda: store)
+
+    fix = fixer.Fixer(CMIP5_IDS[0])
+    assert fix.post_processors == [[squeeze_dims, {"dims": ["lev"]}]]
+    assert fixer.Fixer(CMIP5_IDS[1]).post_processors == []
+
+
+def test_fixer_for_collection_uses_cache(monkeypatch):
+    store = FakeFixStore({})
+    monkeypatch.setattr(fixer, "get_fix_store", lambda: store)
+
+    fixer.Fixer.for_collection(CMIP5_IDS)
+    fixer.Fixer.for_collection(CMIP5_IDS)
+
+    assert len(store.calls) == 1
+    assert fixer.get_fix_cache().hits == 2
+
+
+def test_fix_cache_negative_and_ttl(monkeypatch):
+    cache = fixer.FixCache(ttl=10, maxsize=10)
+    now = 1000.0
+    monkeypatch.setattr(fixer.time, "time", lambda: now)
+
+    assert cache.get("a") is fixer.MISSING
+    cache.set("a", None)
+    assert cache.get("a") is None
+
+    now += 11
+    assert cache.get("a") is fixer.MISSING
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_fix_cache_lru_eviction():
+    cache = fixer.FixCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is fixer.MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_fix_cache_persistent(tmp_path):
+    path = tmp_path.joinpath("fixes.sqlite").as_posix()
+    fixer.FixCache(path=path).set("a", {"_source": FIX_DOC})
+
+    assert fixer.FixCache(path=path).get("a") == {"_source": FIX_DOC}
+
+
+def test_fixes_are_resolved_once(monkeypatch):
+    from daops.data_utils import common_utils
+
+    located = []
+
+    def _locate(path):
+        located.append(path)
+        return squeeze_dims
+
+    fixer.compile_fixes.cache_clear()
+    monkeypatch.setattr(common_utils, "_resolved", {})
+    monkeypatch.setattr(common_utils, "locate", _locate)
+
+    first = fixer.Fixer._from_content(CMIP5_IDS[0], {"_source": FIX_DOC})
+    second = fixer.Fixer._from_content(CMIP5_IDS[1], {"_source": FIX_DOC})
+
+    assert located == ["daops.data_utils.coord_utils.squeeze_dims"]
+    assert fixer.compile_fixes.cache_info().hits == 1
+    assert first.post_processors == second.post_processors
+    assert first.post_processors == [[squeeze_dims, {"dims": ["lev"]}]]
+
+    # each fixer has its own lists of processors
+    first.post_processors.clear()
+    assert second.post_processors == [[squeeze_dims, {"dims": ["lev"]}]]
+
+
+class FailingFixStore(FakeFixStore):
+    def mget(self, ids):
+        if not self.calls:
+            self.calls.append(ids)
+            raise Exception("Failed to retrieve fixes")
+        return super().mget(ids)
+
+
+def test_fixer_for_collection_error_not_cached(monkeypatch):
+    store = FailingFixStore({})
+    monkeypatch.setattr(fixer, "get_fix_store", lambda: store)
+
+    with pytest.raises(Exception, match="Failed to retrieve fixes"):
+        fixer.Fixer.for_collection(CMIP5_IDS)
+
+    # the datasets were not cached as having no fixes, so are looked up again
+    fixer.Fixer.for_collection(CMIP5_IDS)
+    assert len(store.calls) == 2
@@ -0,0 +1,32 @@
+import time
+
+from daops.utils.metrics import input_metrics, peak_rss, timer
+
+
+def test_timer():
+    metrics = {}
+
+    for _ in range(2):
+        with timer(metrics, "open"):
+            time.sleep(0.01)
+
+    # time is added up over each use
+    assert metrics["open"] >= 0.02
+
+    with timer(None, "open"):
+        pass
+
+
+def test_input_metrics(tmp_path):
+    fpath = tmp_path.joinpath("in.nc")
+    fpath.write_bytes(b"data")
+
+    assert input_metrics([fpath.as_posix(), "https://host/in.nc"]) == {
+        "input_files": 2,
+        "input_bytes": 4,
+    }
+    assert input_metrics(fpath.as_posix()) == {"input_files": 1, "input_bytes": 4}
+
+
+def test_peak_rss():
+    assert peak_rss() > 0
@@ -1,5 +1,8 @@
+import time
 from collections import OrderedDict
 
+import pytest
+from daops.utils import normalise
 from daops.utils.normalise import ResultSet
 
 
@@ -51,3 +54,79 @@ def test_file_uris_files(stratus):
         f"{stratus.path}/badc/cmip6/data/CMIP6/CMIP/IPSL/IPSL-CM6A-LR/historical"
         "/r1i1p1f1/Amon/rlds/gr/v20180803/rlds_Amon_IPSL-CM6A-LR_historical_r1i1p1f1_gr_185001-201412.nc"
     ]
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 2])
+def test_iter_normalise_is_lazy(monkeypatch, prefetch):
+    opened = []
+
+    def _open_dataset(ds_id, file_paths, apply_fixes=True, fix=None):
+        opened.append(ds_id)
+        return file_paths
+
+    monkeypatch.setattr(normalise, "open_dataset", _open_dataset)
+    collection = OrderedDict([(f"ds{i}", [f"file{i}.nc"]) for i in range(5)])
+
+    norm_collection = normalise.iter_normalise(
+        collection, apply_fixes=False, prefetch=prefetch
+    )
+    dset, ds = next(norm_collection)
+
+    assert (dset, ds) == ("ds0", ["file0.nc"])
+
+    # wait for the background thread to open the prefetched datasets
+    deadline = time.monotonic() + 5
+    while len(opened) < 1 + prefetch and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(opened) == 1 + prefetch
+
+    assert list(norm_collection) == [(f"ds{i}", [f"file{i}.nc"]) for i in range(1, 5)]
+    assert opened == list(collection)
+
+
+def test_normalise(monkeypatch):
+    monkeypatch.setattr(
+        normalise, "open_dataset", lambda ds_id, file_paths, *args: file_paths
+    )
+    collection = OrderedDict([("ds0", ["file0.nc"]), ("ds1", ["file1.nc"])])
+    assert normalise.normalise(collection, apply_fixes=False) == collection
+
+
+def test_file_uris_tagged(monkeypatch):
+    from daops.utils.outputs import OutputFile, OutputURL
+
+    def _isfile(path):
+        raise AssertionError("tagged outputs must not be looked up")
+
+    monkeypatch.setattr(normalise.os.path, "isfile", _isfile)
+    result = ResultSet()
+
+    outputs = [OutputFile("/tmp/out_1.nc", size=10), OutputURL("https://host/out_2.nc")]
+    result.add("ds0", outputs)
+
+    assert result.file_uris == outputs
+    assert result.file_uris[0].size == 10
+
+
+@pytest.mark.parametrize("prefetch", [0, 1])
+def test_iter_normalise_capture_errors(monkeypatch, prefetch):
+    def _open_dataset(ds_id, file_paths, apply_fixes=True, fix=None):
+        if ds_id == "ds1":
+            raise ValueError("unreadable")
+        return file_paths
+
+    monkeypatch.setattr(normalise, "open_dataset", _open_dataset)
+    collection = OrderedDict([(f"ds{i}", [f"file{i}.nc"]) for i in range(3)])
+
+    with pytest.raises(ValueError):
+        list(normalise.iter_normalise(collection, apply_fixes=False, prefetch=prefetch))
+
+    norm_collection = list(
+        normalise.iter_normalise(
+            collection, apply_fixes=False, prefetch=prefetch, capture_errors=True
+        )
+    )
+
+    assert [dset for dset, _ in norm_collection] == list(collection)
+    assert isinstance(norm_collection[1][1], ValueError)
+    assert norm_collection[2] == ("ds2", ["file2.nc"])
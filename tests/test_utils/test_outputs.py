@@ -0,0 +1,100 @@
+import hashlib
+import pickle
+
+import xarray as xr
+from daops.utils.outputs import (
+    OutputFile,
+    OutputURL,
+    Outputs,
+    TaggedOperation,
+    output_metrics,
+    tag_outputs,
+)
+
+
+def test_tag_outputs(monkeypatch):
+    import daops.utils.outputs
+
+    def _stat(path):
+        raise AssertionError("outputs must be tagged without accessing the file system")
+
+    monkeypatch.setattr(daops.utils.outputs, "_stat", _stat)
+    ds = xr.Dataset()
+
+    outputs = tag_outputs(["/tmp/out.nc", "https://host/out.nc", ds], "netcdf")
+
+    assert isinstance(outputs[0], OutputFile)
+    assert outputs[0] == "/tmp/out.nc"
+    assert outputs[0].size is None
+    assert outputs[0].checksum is None
+    assert isinstance(outputs[1], OutputURL)
+    assert outputs[2] is ds
+
+
+def test_tag_outputs_record_size(tmp_path):
+    fpath = tmp_path.joinpath("out.nc")
+    fpath.write_bytes(b"data")
+
+    outputs = tag_outputs([fpath, tmp_path], "zarr", record_size=True)
+
+    assert outputs[0] == fpath.as_posix()
+    assert outputs[0].size == 4
+    # no size is recorded for directories, e.g. zarr stores
+    assert isinstance(outputs[1], OutputFile)
+    assert outputs[1].size is None
+
+
+def test_tag_outputs_checksum(tmp_path):
+    fpath = tmp_path.joinpath("out.nc")
+    fpath.write_bytes(b"data")
+
+    (output,) = tag_outputs([fpath], "netcdf", checksum="sha256")
+
+    assert output.size == 4
+    assert output.checksum == f"sha256:{hashlib.sha256(b'data').hexdigest()}"
+
+
+def test_tag_outputs_xarray(tmp_path):
+    fpath = tmp_path.joinpath("out.nc")
+    fpath.write_bytes(b"data")
+
+    # outputs of types without a writer are never files
+    (output,) = tag_outputs([fpath.as_posix()], "xarray")
+    assert type(output) is str
+
+
+def test_output_file_pickle():
+    output = pickle.loads(pickle.dumps(OutputFile("/tmp/out.nc", 4, "sha256:00")))
+
+    assert isinstance(output, OutputFile)
+    assert (output, output.size, output.checksum) == ("/tmp/out.nc", 4, "sha256:00")
+
+
+def test_tagged_operation(tmp_path):
+    fpath = tmp_path.joinpath("out.nc")
+    fpath.write_bytes(b"data")
+
+    def write(ds, **kwargs):
+        return [fpath.as_posix()]
+
+    operation = TaggedOperation(write)
+
+    assert operation.__name__ == "write"
+    assert isinstance(operation(None, output_type="netcdf")[0], OutputFile)
+
+
+def test_outputs_pickle():
+    outputs = pickle.loads(pickle.dumps(Outputs([1, 2], {"process": 0.1})))
+
+    assert outputs == [1, 2]
+    assert outputs.metrics == {"process": 0.1}
+
+
+def test_output_metrics():
+    outputs = [OutputFile("/tmp/out_1.nc", size=3), OutputFile("/tmp/out_2.nc", 4)]
+
+    assert output_metrics(outputs) == {"output_files": 2, "output_bytes": 7}
+    assert output_metrics([OutputFile("/tmp/out.nc"), xr.Dataset()]) == {
+        "output_files": 1,
+        "output_bytes": None,
+    }
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+import xarray as xr
+from daops.data_utils.attr_utils import (
+    add_global_attrs_if_needed,
+    edit_global_attrs,
+    edit_var_attrs,
+    remove_coord_attr,
+)
+from daops.data_utils.coord_utils import add_coord, add_scalar_coord, squeeze_dims
+from daops.data_utils.var_utils import add_data_var
+from daops.utils.post_processor import apply_post_processors
+
+DS_ID = "c3s-cmip6-decadal.DCPP.MOHC.HadGEM3-GC31-MM.dcppA-hindcast.s1960-r1i1p1f2.Amon.tas.gn.v20200417"
+
+DECADAL_FIXES = [
+    (
+        edit_global_attrs,
+        {
+            "attrs": {
+                "forcing_description": "derive: daops.fix_utils.decadal_utils.get_decadal_model_attr_from_dict: forcing_description",
+                "startdate": "derive: daops.fix_utils.decadal_utils.get_sub_experiment_id",
+                "sub_experiment_id": "derive: daops.fix_utils.decadal_utils.get_sub_experiment_id",
+            }
+        },
+    ),
+    (add_global_attrs_if_needed, {"attrs": {"institution": "MOHC", "source": "x"}}),
+    (
+        add_scalar_coord,
+        {
+            "var_id": "reftime",
+            "value": "derive: daops.fix_utils.decadal_utils.get_reftime",
+            "dtype": "datetime64[ns]",
+            "attrs": {
+                "long_name": "Start date of the forecast",
+                "standard_name": "forecast_reference_time",
+            },
+            "encoding": {"dtype": "int32", "units": "days since 1850-01-01"},
+        },
+    ),
+    (
+        add_coord,
+        {
+            "var_id": "leadtime",
+            "dim": ["time"],
+            "value": "derive: daops.fix_utils.decadal_utils.get_lead_times",
+            "dtype": "float64",
+            "attrs": {
+                "long_name": "Time elapsed since the start of the forecast",
+                "units": "days",
+            },
+            "encoding": {"dtype": "double"},
+        },
+    ),
+    (
+        add_scalar_coord,
+        {
+            "var_id": "realization",
+            "value": "1",
+            "dtype": "int32",
+            "attrs": {"long_name": "realization"},
+            "encoding": {"dtype": "int32"},
+        },
+    ),
+    (edit_var_attrs, {"var_id": "realization", "attrs": {"units": "1"}}),
+    (edit_var_attrs, {"var_id": "time", "attrs": {"long_name": "valid_time"}}),
+    (remove_coord_attr, {"var_ids": ["time_bnds", "realization"]}),
+    (
+        add_data_var,
+        {
+            "var_id": "crs",
+            "value": 1,
+            "dtype": "int32",
+            "attrs": {"grid_mapping_name": "latitude_longitude"},
+        },
+    ),
+    (edit_var_attrs, {"var_id": "crs", "attrs": {"comment": "added"}}),
+]
+
+
+def make_dataset(n_times=120):
+    times = xr.date_range(
+        "1960-11-16", periods=n_times, freq="MS", calendar="360_day", use_cftime=True
+    )
+    return xr.Dataset(
+        {
+            "tas": (("time", "lat", "lon"), np.zeros((n_times, 3, 4), dtype="f4")),
+            "time_bnds": (("time", "bnds"), np.zeros((n_times, 2))),
+        },
+        coords={"time": times, "lat": np.arange(3.0), "lon": np.arange(4.0)},
+        attrs={"source": "HadGEM3", "further_info_url": "none"},
+    )
+
+
+def apply_in_turn(ds_id, ds, post_processors):
+    for func, operands in post_processors:
+        ds = func(ds_id, ds, **operands)
+    return ds
+
+
+def assert_same(actual, expected):
+    xr.testing.assert_identical(actual, expected)
+    assert list(actual.variables) == list(expected.variables)
+    for name, var in expected.variables.items():
+        assert actual[name].encoding == var.encoding, name
+
+
+@pytest.mark.parametrize(
+    "post_processors",
+    [
+        DECADAL_FIXES,
+        # a fix that cannot be batched splits the batch in two
+        DECADAL_FIXES[:4] + [(squeeze_dims, {"dims": []})] + DECADAL_FIXES[4:],
+        # removing the coordinates attribute of the main variable after adding coordinates
+        DECADAL_FIXES[:5]
+        + [(remove_coord_attr, {"var_ids": ["tas"]})]
+        + DECADAL_FIXES[5:],
+    ],
+)
+def test_apply_post_processors(post_processors):
+    expected = apply_in_turn(DS_ID, make_dataset(), post_processors)
+    actual = apply_post_processors(DS_ID, make_dataset(), post_processors)
+    assert_same(actual, expected)
+
+
+def test_apply_post_processors_assigns_once(monkeypatch):
+    calls = []
+    assign_coords = xr.Dataset.assign_coords
+
+    def _assign_coords(self, *args, **kwargs):
+        calls.append(args)
+        return assign_coords(self, *args, **kwargs)
+
+    monkeypatch.setattr(xr.Dataset, "assign_coords", _assign_coords)
+    apply_post_processors(DS_ID, make_dataset(), DECADAL_FIXES)
+    assert len(calls) == 1
@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from daops.utils.shared import ProcessLocal, SharedObjects
+
+
+def test_process_local(monkeypatch):
+    calls = []
+    local = ProcessLocal(lambda: calls.append(1) or object())
+
+    obj = local.get()
+    assert local.get() is obj
+    assert len(calls) == 1
+
+    # a forked worker process creates its own object
+    pid = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: pid + 1)
+    assert local.get() is not obj
+    assert len(calls) == 2
+
+
+def test_shared_objects():
+    shared = SharedObjects()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        objs = list(executor.map(lambda _: shared.get("a", object), range(8)))
+
+    assert all(obj is objs[0] for obj in objs)
+    other = shared.get("b", object)
+    assert other is not objs[0]
+
+    assert shared.clear() == [objs[0], other]
+    assert shared.get("a", object) is not objs[0]
+
+
+def test_shared_objects_per_process(monkeypatch):
+    shared = SharedObjects(per_process=True)
+    obj = shared.get("a", object)
+
+    pid = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: pid + 1)
+    assert shared.get("a", object) is not obj